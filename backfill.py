@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import time
+from datetime import datetime, date, time as dtime
+from daily_update import (
+    build_prompt_within_budget,
+    cached_forecast,
+    fetch_news_for_period,
+    fmp_session,
+    news_session,
+    openai_client,
+)
+from data_events import notify_data_changed
+from db import connect, forecast_day_row, write_days
+from price_store import aupdate_daily, daily_store
+from metrics import rebuild_metrics
+from news_ranking import rank_headlines
+from sentiment import score_articles
+from trading_calendar import previous_trading_day, trading_days_between
+
+# Finished dates are checkpointed in the DB so an interrupted run resumes where it stopped
+CHECKPOINT_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    date DATE PRIMARY KEY,
+    status TEXT NOT NULL,
+    error TEXT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+# Default per-provider request budgets (requests per minute)
+DEFAULT_RATE_LIMITS = {"fmp": 250, "news": 30, "openai": 60}
+
+class RateLimiter:
+    # Spaces calls to one provider at least 60/per_minute seconds apart across all workers
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+# — DB helpers (run in worker threads on pooled connections) —
+def pending_dates(days, force=False):
+    connection = connect()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(CHECKPOINT_TABLE_DDL)
+            connection.commit()
+            if force:
+                return days
+            cursor.execute(
+                """
+                SELECT date FROM predictions WHERE date = ANY(%s)
+                UNION
+                SELECT date FROM backfill_checkpoints WHERE status = 'done' AND date = ANY(%s)
+                """,
+                (days, days)
+            )
+            finished = {row[0] for row in cursor.fetchall()}
+        return [day for day in days if day not in finished]
+    finally:
+        connection.close()
+
+def mark_checkpoints(cursor, days, status, error=None):
+    cursor.execute(
+        """
+        INSERT INTO backfill_checkpoints (date, status, error, updated_at)
+        SELECT unnest(%s::date[]), %s, %s, now()
+        ON CONFLICT (date) DO UPDATE SET
+          status = EXCLUDED.status,
+          error = EXCLUDED.error,
+          updated_at = EXCLUDED.updated_at
+        """,
+        (days, status, error)
+    )
+
+def write_backfilled_days(rows):
+    # Every finished day of a batch is written and checkpointed in one transaction
+    connection = connect()
+    try:
+        with connection.cursor() as cursor:
+            counts = write_days(cursor, rows)
+            mark_checkpoints(cursor, [row["date"] for row in rows], "done")
+        connection.commit()
+        return counts
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+def forecast_with_cache(client, prompt, inputs):
+    connection = connect()
+    try:
+        with connection.cursor() as cursor:
+            parsed = cached_forecast(cursor, client, prompt, inputs)
+        connection.commit()
+        return parsed
+    finally:
+        connection.close()
+
+def write_failure(day, error):
+    connection = connect()
+    try:
+        with connection.cursor() as cursor:
+            mark_checkpoints(cursor, [day], "failed", error)
+        connection.commit()
+    finally:
+        connection.close()
+
+def finish_backfill(last_day):
+    connection = connect()
+    try:
+        with connection.cursor() as cursor:
+            rebuild_metrics(cursor)
+            notify_data_changed(cursor, "metrics_aggregates", last_day)
+        connection.commit()
+    finally:
+        connection.close()
+
+class BatchWriter:
+    # Collects finished days and flushes them as one batched upsert
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.rows = []
+        self.lock = asyncio.Lock()
+        self.written = 0
+        self.failed = 0
+
+    async def add(self, row):
+        async with self.lock:
+            self.rows.append(row)
+            if len(self.rows) >= self.batch_size:
+                await self._flush()
+
+    async def flush(self):
+        async with self.lock:
+            await self._flush()
+
+    async def _flush(self):
+        if not self.rows:
+            return
+        rows, self.rows = self.rows, []
+        try:
+            counts = await asyncio.to_thread(write_backfilled_days, rows)
+            self.written += len(rows)
+            print(f"[LOG] Wrote batch of {len(rows)} days: {counts}")
+        except Exception as e:
+            self.failed += len(rows)
+            print(f"❌ Error writing batch of {len(rows)} days: {e}")
+            for row in rows:
+                await asyncio.to_thread(write_failure, row["date"], str(e))
+
+# — Data gathering —
+async def load_daily_bars(fmp, start: date, end: date, throttle=None):
+    # One request at most covers the whole range; nothing is fetched if the store already has it
+    store = daily_store()
+    if store.first_day is None or start < store.first_day or end > store.last_day:
+        fetch_from = start if store.first_day is None or start < store.first_day else store.last_day
+        added = await aupdate_daily(fmp, store, start=fetch_from, throttle=throttle)
+        print(f"[LOG] Stored {added} new daily bars")
+    return store
+
+async def backfill_date(day, bars, news, client, limits, writer):
+    closing_day = previous_trading_day(day)
+    print(f"[LOG] Backfilling Forecast Day: {day}, Closing Day: {closing_day}")
+
+    close_price = bars.close_on(closing_day)
+    open_price = bars.open_on(day)
+    vt_data = {"date": closing_day, "close": close_price} if close_price is not None else None
+    vt_open_data = {"date": day, "open": open_price} if open_price is not None else None
+    if vt_data is None:
+        print(f"⚠️ No closing price found for {closing_day}. Skipping database update for closing price.")
+    if vt_open_data is None:
+        print(f"⚠️ No open price found for {day}. Skipping database update for opening price.")
+
+    # Historical pre-market signals are not available from the providers
+    pre_market = {"signal": "neutral"}
+
+    # Fetch news from the day before (after 4:30 PM NYC time) to the forecast day (up until 9:30 AM NYC time)
+    # The limiter also paces retries, not just the first attempt
+    news_articles = await fetch_news_for_period(
+        news,
+        since=datetime.combine(closing_day, dtime(16, 30)),
+        until=datetime.combine(day, dtime(9, 30)),
+        throttle=limits["news"].wait,
+    )
+    headlines = rank_headlines(news_articles)
+    if not headlines:
+        raise ValueError("No valid headlines")
+
+    prompt = build_prompt_within_budget(day, vt_data, pre_market, headlines, vt_open_data)
+    inputs = {
+        "forecast_day": day,
+        "vt_data": vt_data,
+        "vt_open_data": vt_open_data,
+        "pre_market": pre_market,
+        "headlines": headlines,
+    }
+    await limits["openai"].wait()
+    parsed = await asyncio.to_thread(forecast_with_cache, client, prompt, inputs)
+    print(f"✅ Forecast for {day}: {parsed}")
+
+    await writer.add(forecast_day_row(
+        day, parsed,
+        close_yesterday=vt_data["close"] if vt_data else None,
+        open_today=vt_open_data["open"] if vt_open_data else None,
+        scores=score_articles(news_articles),
+    ))
+
+async def run_backfill(start: date, end: date, workers=4, rate_limits=None, force=False, batch_size=20):
+    rate_limits = {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}
+    limits = {provider: RateLimiter(per_minute) for provider, per_minute in rate_limits.items()}
+
+    days = list(trading_days_between(start, end))
+    todo = await asyncio.to_thread(pending_dates, days, force)
+    print(f"[LOG] {len(days)} trading days in range, {len(todo)} left to backfill")
+    if not todo:
+        print("🏁 Done!")
+        return
+
+    client = openai_client()
+    semaphore = asyncio.Semaphore(workers)
+    writer = BatchWriter(batch_size)
+
+    async with fmp_session() as fmp, news_session() as news:
+        bars = await load_daily_bars(fmp, previous_trading_day(todo[0]), todo[-1], throttle=limits["fmp"].wait)
+
+        async def worker(day):
+            async with semaphore:
+                try:
+                    await backfill_date(day, bars, news, client, limits, writer)
+                except Exception as e:
+                    print(f"❌ Error on {day}: {e}")
+                    await asyncio.to_thread(write_failure, day, str(e))
+
+        await asyncio.gather(*(worker(day) for day in todo))
+        await writer.flush()
+
+    print(f"[LOG] Backfilled {writer.written}/{len(todo)} days, {len(todo) - writer.written} failed")
+    if writer.written:
+        print("[LOG] Rebuilding metrics for the backfilled history")
+        await asyncio.to_thread(finish_backfill, todo[-1])
+    print("🏁 Done!")
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill VT forecasts for a range of trading days.")
+    parser.add_argument("--start", type=parse_date, required=True, help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", type=parse_date, help="Last date (YYYY-MM-DD), defaults to --start")
+    parser.add_argument("--workers", type=int, default=4, help="Dates processed concurrently")
+    parser.add_argument("--fmp-rpm", type=int, default=DEFAULT_RATE_LIMITS["fmp"])
+    parser.add_argument("--news-rpm", type=int, default=DEFAULT_RATE_LIMITS["news"])
+    parser.add_argument("--openai-rpm", type=int, default=DEFAULT_RATE_LIMITS["openai"])
+    parser.add_argument("--force", action="store_true", help="Redo dates that already have predictions")
+    parser.add_argument("--batch-size", type=int, default=20, help="Days written per database round trip")
+    args = parser.parse_args()
+
+    rate_limits = {"fmp": args.fmp_rpm, "news": args.news_rpm, "openai": args.openai_rpm}
+    asyncio.run(run_backfill(
+        args.start, args.end or args.start, args.workers, rate_limits, args.force, args.batch_size
+    ))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from datetime import date, datetime, timedelta
+import numpy as np
+
+# Load test for the API against a synthetic history.
+# Seeds a scratch Postgres with N years of daily_data / predictions / headlines
+# (through the same batched writer and metrics rebuild the jobs use), then
+# drives main.app in-process with concurrent httpx clients and records
+# throughput, p50/p95/p99 latency and per-request allocation peaks. Results are
+# written as JSON; `--compare old.json new.json` prints the relative change.
+#
+#   BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_api.py --years 1 5 20 --concurrency 1 5 20
+#
+# The benchmark DROPS and recreates the tables, so it refuses to run against DATABASE_URL.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+WORDS = (
+    "stocks futures rally slump inflation fed rates yields oil dollar earnings guidance "
+    "europe asia china tariffs jobs payrolls cpi recession growth tech banks energy "
+    "investors traders markets outlook volatility record gains losses"
+).split()
+VOLATILITY = np.array(["low", "medium", "high"])
+
+# name -> (path builder, cold): cold scenarios bypass the in-process payload cache
+SCENARIOS = {
+    "results": (lambda days, rng: "/results", True),
+    "results_warm": (lambda days, rng: "/results", False),
+    "results_columnar": (lambda days, rng: "/results?format=columnar", True),
+    "results_summaries": (lambda days, rng: "/results?include=summaries", True),
+    "results_ndjson": (lambda days, rng: "/results?format=ndjson", True),
+    "results_page": (lambda days, rng: "/results?limit=250", True),
+    "summary": (lambda days, rng: f"/summary/{days[rng.integers(len(days))]}", True),
+    "summaries_year": (lambda days, rng: f"/summaries?from={days[-1] - timedelta(days=365)}", True),
+    "metrics": (lambda days, rng: "/metrics", True),
+}
+
+def configure_database():
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        sys.exit("Set BENCH_DATABASE_URL to a scratch database (its tables are dropped and reseeded)")
+    if url == os.getenv("DATABASE_URL"):
+        sys.exit("BENCH_DATABASE_URL must not be the application's DATABASE_URL")
+    # db.py and main.py read DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = url
+    sys.path.insert(0, ROOT)
+
+# — Seeding —
+def synthetic_days(years, seed):
+    from trading_calendar import previous_trading_day, trading_days_between
+
+    end = previous_trading_day(date.today())
+    days = list(trading_days_between(end - timedelta(days=int(years * 365.25)), end))
+    rng = np.random.default_rng(seed)
+    n = len(days)
+
+    moves = rng.normal(0, 0.6, n)
+    closes = 100 * np.cumprod(1 + rng.normal(0, 0.8, n) / 100)
+    opens = closes * (1 + moves / 100)
+    forecasts = np.round(0.3 * moves + rng.normal(0, 0.5, n), 2)
+    confidence = rng.integers(40, 91, n)
+    volatility = VOLATILITY[rng.integers(0, 3, n)]
+    sentiment = rng.integers(0, 101, n)
+    impact = rng.integers(0, 101, n)
+
+    rows = []
+    for i, day in enumerate(days):
+        rows.append({
+            "date": day,
+            "close_yesterday": round(float(closes[i]), 4),
+            "open_today": round(float(opens[i]), 4),
+            "forecasted_pct": float(forecasts[i]),
+            "confidence_level": int(confidence[i]),
+            "volatility_indicator": str(volatility[i]),
+            "average_pct": float(forecasts[i]),
+            "sentiment_score": int(sentiment[i]),
+            "market_impact_score": int(impact[i]),
+            "headline": " ".join(rng.choice(WORDS, 60)).capitalize() + ".",
+        })
+    return rows
+
+def reset_schema():
+    # Empty tables shaped like production; forecast_cache and checkpoints are recreated on demand
+    from db import connect, get_engine, metadata
+
+    connection = connect()
+    cursor = connection.cursor()
+    cursor.execute("DROP TABLE IF EXISTS results, metrics_aggregates, headlines, predictions, daily_data, "
+                   "forecast_cache, backfill_checkpoints CASCADE")
+    connection.commit()
+    metadata.create_all(get_engine())
+    # The writers upsert headlines by date, as in production
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS headlines_date_key ON headlines (date)")
+    connection.commit()
+    cursor.close()
+    connection.close()
+
+def seed_database(years, seed, chunk_size=500):
+    from db import connect, write_days
+    from metrics import rebuild_metrics
+
+    reset_schema()
+    connection = connect()
+    cursor = connection.cursor()
+    rows = synthetic_days(years, seed)
+    started = time.perf_counter()
+    for i in range(0, len(rows), chunk_size):
+        write_days(cursor, rows[i:i + chunk_size])
+    rebuild_metrics(cursor)
+    connection.commit()
+    cursor.execute("ANALYZE")
+    connection.commit()
+    cursor.close()
+    connection.close()
+    print(f"[LOG] Seeded {len(rows)} trading days ({years}y) in {time.perf_counter() - started:.1f}s")
+    return [row["date"] for row in rows]
+
+# — Load generation —
+def percentiles(latencies):
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "p99_ms": round(p99, 3), "mean_ms": round(ms.mean(), 3)}
+
+async def drive(client, path_for, concurrency, total):
+    latencies, sizes = [], []
+    errors = 0
+    issued = 0
+
+    async def worker():
+        nonlocal errors, issued
+        while issued < total:
+            issued += 1
+            path = path_for()
+            started = time.perf_counter()
+            response = await client.get(path)
+            body = response.content
+            latencies.append(time.perf_counter() - started)
+            sizes.append(len(body))
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "mean_bytes": int(np.mean(sizes)) if sizes else 0,
+        **percentiles(latencies),
+    }
+
+async def allocation_peaks(client, path_for, samples):
+    # Sequential pass under tracemalloc: peak traced memory above the baseline per request
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await client.get(path_for())
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return {"alloc_peak_kib_p50": round(float(np.median(peaks)) / 1024, 1) if peaks else None}
+
+async def run_suite(days, scenarios, concurrencies, requests, alloc_samples, seed):
+    import httpx
+    import main
+
+    await main.startup()
+    rng = np.random.default_rng(seed)
+    cache_size = main.results_cache.max_entries
+    results = []
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in scenarios:
+                builder, cold = SCENARIOS[name]
+                path_for = lambda: builder(days, rng)
+                # A zero-sized payload cache makes every request rebuild (query + serialization)
+                main.results_cache.max_entries = 0 if cold else cache_size
+                main.results_cache.entries.clear()
+                await drive(client, path_for, 1, 3)  # warm up connections and plans
+
+                for concurrency in concurrencies:
+                    stats = await drive(client, path_for, concurrency, requests)
+                    results.append({"scenario": name, "cold": cold, "concurrency": concurrency, **stats})
+                    print(f"  {name:<18} c={concurrency:<3} {stats['throughput_rps']:>9} rps  "
+                          f"p50 {stats['p50_ms']:>8} ms  p95 {stats['p95_ms']:>8} ms  p99 {stats['p99_ms']:>8} ms")
+                if alloc_samples:
+                    allocations = await allocation_peaks(client, path_for, alloc_samples)
+                    for row in results:
+                        if row["scenario"] == name:
+                            row.update(allocations)
+    finally:
+        main.results_cache.max_entries = cache_size
+        await main.shutdown()
+    return results
+
+async def run_sizes(report, args):
+    for years in args.years:
+        print(f"[LOG] Benchmarking {years}y of history")
+        days = seed_database(years, args.seed)
+        results = await run_suite(days, args.scenarios, args.concurrency, args.requests,
+                                  args.alloc_samples, args.seed)
+        report["runs"].append({"years": years, "days": len(days), "results": results})
+
+# — Reporting —
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+    }
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    def index(report):
+        return {(run["years"], row["scenario"], row["concurrency"]): row
+                for run in report["runs"] for row in run["results"]}
+
+    before, after = index(old), index(new)
+    print(f"{'years':>5} {'scenario':<18} {'c':>3} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'alloc':>8}")
+    for key in sorted(before.keys() & after.keys()):
+        a, b = before[key], after[key]
+        cells = []
+        for field in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "alloc_peak_kib_p50"):
+            if a.get(field) and b.get(field) is not None:
+                cells.append(f"{(b[field] - a[field]) / a[field] * 100:+7.1f}%")
+            else:
+                cells.append(f"{'-':>8}")
+        print(f"{key[0]:>5} {key[1]:<18} {key[2]:>3} " + " ".join(cells))
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the API against a synthetic history.")
+    parser.add_argument("--years", type=float, nargs="+", default=[1, 5, 20], help="History sizes to seed")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 20], help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and concurrency")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--alloc-samples", type=int, default=20, help="Requests traced for allocations (0 to skip)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    configure_database()
+    report = {"environment": environment(), "requests": args.requests, "runs": []}
+    # One event loop for every size: the app's locks and connections are bound to it
+    asyncio.run(run_sizes(report, args))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[LOG] Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import inspect
+import argparse
+import tempfile
+import functools
+from collections import defaultdict
+from datetime import datetime, time as dtime
+import numpy as np
+from bench_api import configure_database, environment, reset_schema
+from stub_servers import add_stub_arguments, app_from_args, env_urls, serve_in_thread
+
+# Offline end-to-end timing of the jobs against benchmarks/stub_servers.py.
+# Runs the forecast job, the market-open job, the forecast job again (warm
+# caches) and a multi-day backfill on a scratch database, timing every stage.
+#
+#   BENCH_DATABASE_URL=postgresql://... python benchmarks/bench_pipeline.py --days 20 --latency openai=1500
+#
+# HTTP and price caches live in a temporary directory unless --cache-dir is given.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# module -> functions whose calls are timed (patched on the module the job looks them up in)
+STAGES = {
+    "daily_update": [
+        "gather_forecast_inputs", "fetch_vt_close_data", "fetch_pre_market_signals", "fetch_news_for_period",
+        "rank_headlines", "build_prompt_within_budget", "cached_forecast", "score_articles", "save_forecast",
+    ],
+    "market_open_update": ["fetch_open_price", "write_days", "evaluate", "fold_scored_days"],
+    "backfill": [
+        "load_daily_bars", "fetch_news_for_period", "rank_headlines", "score_articles",
+        "forecast_with_cache", "write_backfilled_days", "finish_backfill",
+    ],
+}
+
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, name, fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    self.samples[name].append(time.perf_counter() - started)
+        else:
+            @functools.wraps(fn)
+            def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.samples[name].append(time.perf_counter() - started)
+        return timed
+
+    def instrument(self, module):
+        for name in STAGES[module.__name__]:
+            setattr(module, name, self.wrap(f"{module.__name__}.{name}", getattr(module, name)))
+
+    def take(self):
+        # Per-stage busy time since the last call; concurrent stages can add up to more than the wall time
+        stages = {
+            name: {
+                "calls": len(samples),
+                "total_s": round(sum(samples), 4),
+                "mean_ms": round(float(np.mean(samples)) * 1000, 2),
+                "max_ms": round(max(samples) * 1000, 2),
+            }
+            for name, samples in sorted(self.samples.items())
+        }
+        self.samples.clear()
+        return stages
+
+def configure_environment(args, port):
+    cache_dir = args.cache_dir or tempfile.mkdtemp(prefix="ai4vt-bench-")
+    os.environ["HTTP_CACHE_DIR"] = os.path.join(cache_dir, "http")
+    os.environ["PRICE_STORE_DIR"] = os.path.join(cache_dir, "prices")
+    os.environ["TELEMETRY_RUNS_FILE"] = os.path.join(cache_dir, "runs.jsonl")
+    os.environ.update(env_urls(f"http://127.0.0.1:{port}"))
+    for key in ("FMP_API_KEY", "NEWS_API_KEY", "OPENAI_API_KEY"):
+        os.environ[key] = "stub"
+    return cache_dir
+
+def timed_run(timer, stubs, name, fn):
+    before = dict(stubs.state.requests)
+    started = time.perf_counter()
+    fn()
+    wall = time.perf_counter() - started
+    requests = {p: n - before.get(p, 0) for p, n in stubs.state.requests.items()}
+    print(f"  {name:<20} {wall:8.2f}s  requests {requests}")
+    return {"name": name, "wall_s": round(wall, 3), "provider_requests": requests, "stages": timer.take()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the jobs offline against local provider stubs.")
+    parser.add_argument("--day", type=lambda v: datetime.strptime(v, "%Y-%m-%d").date(),
+                        help="Trading day to simulate (default: the last one before today)")
+    parser.add_argument("--days", type=int, default=20, help="Trading days in the backfill run (0 to skip)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--cache-dir", help="Keep HTTP and price caches here (default: a fresh temp dir)")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/pipeline-<timestamp>.json)")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    configure_database()
+    stubs = app_from_args(args)
+    server, thread = serve_in_thread(stubs, args.port)
+    cache_dir = configure_environment(args, args.port)
+
+    # The jobs read their settings at import time
+    import backfill
+    import daily_update
+    import market_open_update
+    from trading_calendar import previous_trading_day, trading_days_between
+
+    reset_schema()
+    timer = StageTimer()
+    for module in (daily_update, market_open_update, backfill):
+        timer.instrument(module)
+
+    day = args.day or previous_trading_day(datetime.utcnow().date())
+    forecast_at = datetime.combine(day, dtime(13, 0, 4, 517_203))  # 9:00 NYC, before the open
+    open_at = datetime.combine(day, dtime(14, 0))  # 10:00 NYC, after the first bars
+    # A rerun a few minutes later, as after a failed or manually repeated run
+    rerun_at = datetime.combine(day, dtime(13, 7, 41, 88_512))
+    print(f"[LOG] Simulating {day} (caches in {cache_dir})")
+
+    runs = [
+        timed_run(timer, stubs, "forecast_day", lambda: daily_update.run_forecast_update(now=forecast_at)),
+        timed_run(timer, stubs, "market_open_day", lambda: market_open_update.run_market_open_update(now=open_at)),
+        timed_run(timer, stubs, "forecast_day_warm", lambda: daily_update.run_forecast_update(now=rerun_at)),
+    ]
+    if args.days:
+        end = previous_trading_day(day)
+        start = end
+        for _ in range(args.days - 1):
+            start = previous_trading_day(start)
+        days = len(list(trading_days_between(start, end)))
+        runs.append(timed_run(timer, stubs, f"backfill_{days}d", lambda: asyncio.run(backfill.run_backfill(
+            start, end, workers=args.workers, batch_size=args.batch_size, force=True,
+        ))))
+
+    server.should_exit = True
+    thread.join()
+
+    report = {
+        "environment": environment(),
+        "day": day.isoformat(),
+        "stubs": {"latency": args.latency, "error_rate": args.error_rate, "seed": args.stub_seed},
+        "errors_injected": dict(stubs.state.errors),
+        "runs": runs,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{datetime.utcnow():%Y%m%dT%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"[LOG] Results written to {output}")
+
+if __name__ == "__main__":
+    sys.exit(main())
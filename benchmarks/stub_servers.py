@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Local stand-ins for the paid APIs the jobs call: FMP (quotes, index quotes,
+# daily and 1-min VT bars), NewsAPI /v2/everything and OpenAI chat completions.
+# Payloads are generated deterministically from the requested dates (or
+# replayed from recorded JSON files), with configurable latency and error rates
+# per provider so the jobs can be profiled offline.
+#
+#   python benchmarks/stub_servers.py --port 8900 --latency news=300 openai=1200 --error-rate news=0.05
+#
+# Point the jobs at it with the variables printed on startup.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from features import REGIONS  # noqa: E402
+from trading_calendar import trading_days_between  # noqa: E402
+
+PROVIDERS = ("fmp", "news", "openai")
+DEFAULT_LATENCY_MS = {"fmp": 80, "news": 250, "openai": 900}
+LATENCY_JITTER = 0.25
+
+NEWS_TEMPLATES = [
+    "Stocks {move} as investors weigh {topic}",
+    "Global markets {move} after {topic} data",
+    "{topic} puts Fed rate path in focus as futures {move}",
+    "Wall Street futures {move} ahead of {topic}",
+    "Oil and the dollar {move} on {topic}",
+    "Asian shares {move} as traders digest {topic}",
+    "European stocks {move} with {topic} in view",
+    "Treasury yields {move} following {topic}",
+]
+NEWS_MOVES = ["rally", "slip", "edge higher", "tumble", "hold steady", "climb", "fall"]
+NEWS_TOPICS = ["inflation", "jobs report", "earnings season", "tariffs", "China growth",
+               "ECB decision", "retail sales", "oil supply", "bank results", "recession fears"]
+
+def env_urls(base):
+    return {
+        "FMP_BASE_URL": f"{base}/fmp/api/v3/",
+        "NEWS_API_BASE_URL": f"{base}/news/v2/",
+        "OPENAI_BASE_URL": f"{base}/openai/v1",
+    }
+
+def parse_day(value, default):
+    try:
+        return datetime.strptime(value[:10], "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return default
+
+def day_rng(seed, day, salt=""):
+    return random.Random(f"{seed}:{day.isoformat()}:{salt}")
+
+# — Generated payloads —
+def day_prices(seed, day):
+    # Deterministic per day, independent of the requested range
+    rng = day_rng(seed, day, "price")
+    base = 100 + 10 * ((day.toordinal() % 365) / 365)
+    close = round(base * (1 + rng.gauss(0, 0.01)), 2)
+    open_ = round(close * (1 + rng.gauss(0, 0.006)), 2)
+    return open_, close
+
+def daily_history(seed, symbol, start, end):
+    rows = []
+    for day in trading_days_between(start, end):
+        open_, close = day_prices(seed, day)
+        rows.append({"date": day.isoformat(), "open": open_, "high": max(open_, close) + 0.2,
+                     "low": min(open_, close) - 0.2, "close": close, "volume": 1_000_000})
+    # FMP lists newest first
+    return {"symbol": symbol, "historical": rows[::-1]}
+
+def minute_bars(seed, start, end):
+    rows = []
+    for day in trading_days_between(start, end):
+        open_, close = day_prices(seed, day)
+        rng = day_rng(seed, day, "minutes")
+        price = open_
+        moment = datetime.combine(day, datetime.min.time()) + timedelta(hours=9, minutes=30)
+        for minute in range(390):
+            bar_open = price
+            price = round(price * (1 + rng.gauss(0, 0.0005)), 2)
+            rows.append({"date": (moment + timedelta(minutes=minute)).strftime("%Y-%m-%d %H:%M:%S"),
+                         "open": bar_open, "high": max(bar_open, price), "low": min(bar_open, price),
+                         "close": price, "volume": 1000})
+    return rows[::-1]
+
+def quote(seed, symbol, day):
+    rng = day_rng(seed, day, symbol)
+    return [{"symbol": symbol, "price": round(100 * (1 + rng.gauss(0, 0.01)), 2),
+             "changesPercentage": round(rng.gauss(0, 0.8), 4)}]
+
+def index_quotes(seed, day):
+    symbols = [symbol for members in REGIONS.values() for symbol in members]
+    symbols += [f"^IDX{i}" for i in range(200)]  # the real endpoint returns hundreds of indices
+    return [quote(seed, symbol, day)[0] for symbol in symbols]
+
+def news_articles(seed, since, until, page_size):
+    rng = day_rng(seed, until, "news")
+    articles = []
+    for i in range(page_size):
+        title = rng.choice(NEWS_TEMPLATES).format(move=rng.choice(NEWS_MOVES), topic=rng.choice(NEWS_TOPICS))
+        if i % 7 == 3 and articles:
+            # Wire stories syndicated under slightly different titles
+            title = articles[-1]["title"] + " - Reuters"
+        articles.append({
+            "source": {"id": None, "name": rng.choice(["Reuters", "Bloomberg", "CNBC", "AP", "FT"])},
+            "title": title,
+            "description": f"{title}. Analysts said {rng.choice(NEWS_TOPICS)} remained the main driver.",
+            "publishedAt": (datetime.combine(since, datetime.min.time()) + timedelta(minutes=7 * i)).isoformat() + "Z",
+        })
+    return {"status": "ok", "totalResults": len(articles), "articles": articles}
+
+def chat_completion(body):
+    prompt = json.dumps(body.get("messages", []), sort_keys=True)
+    digest = int(hashlib.sha256(prompt.encode()).hexdigest(), 16)
+    forecast = {
+        "forecasted_pct": round(((digest % 2001) - 1000) / 1000, 2),
+        "confidence_level": 40 + digest % 51,
+        "volatility_indicator": ["low", "medium", "high"][digest % 3],
+        "headline_summary": "Markets weigh macro data and earnings ahead of the open.",
+    }
+    return {
+        "id": f"chatcmpl-stub{digest % 10 ** 8}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": json.dumps(forecast)}}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 60,
+                  "total_tokens": len(prompt) // 4 + 60},
+    }
+
+# — App —
+def create_app(latency_ms=None, error_rate=None, seed=0, replay_dir=None):
+    app = FastAPI(title="AI4VT provider stubs")
+    latency_ms = {**DEFAULT_LATENCY_MS, **(latency_ms or {})}
+    error_rate = {provider: 0.0 for provider in PROVIDERS} | (error_rate or {})
+    rng = random.Random(seed)
+    app.state.requests = Counter()
+    app.state.errors = Counter()
+
+    async def behave(provider, path):
+        # Simulated latency; returns an injected error or a replayed payload to send instead
+        app.state.requests[provider] += 1
+        delay = latency_ms[provider] * max(0.0, rng.gauss(1, LATENCY_JITTER)) / 1000
+        await asyncio.sleep(delay)
+        if rng.random() < error_rate[provider]:
+            app.state.errors[provider] += 1
+            return JSONResponse({"error": "injected failure"}, status_code=503)
+        if replay_dir:
+            recorded = os.path.join(replay_dir, provider, path.strip("/").replace("/", "_") + ".json")
+            if os.path.exists(recorded):
+                with open(recorded) as f:
+                    return JSONResponse(json.load(f))
+        return None
+
+    @app.get("/fmp/api/v3/{path:path}")
+    async def fmp(path: str, request: Request):
+        override = await behave("fmp", path)
+        if override is not None:
+            return override
+        params = request.query_params
+        today = date.today()
+        start = parse_day(params.get("from"), today)
+        end = parse_day(params.get("to"), today)
+        if path.startswith("historical-price-full/"):
+            return daily_history(seed, path.rsplit("/", 1)[-1], start, end)
+        if path.startswith("historical-chart/1min/"):
+            return minute_bars(seed, start, end)
+        if path == "quotes/index":
+            return index_quotes(seed, today)
+        if path.startswith("quote/"):
+            return quote(seed, path.split("/", 1)[1], today)
+        return JSONResponse({"error": f"unknown endpoint {path}"}, status_code=404)
+
+    @app.get("/news/v2/everything")
+    async def news(request: Request):
+        override = await behave("news", "everything")
+        if override is not None:
+            return override
+        params = request.query_params
+        until = parse_day(params.get("to"), date.today())
+        since = parse_day(params.get("from"), until)
+        return news_articles(seed, since, until, int(params.get("pageSize", 100)))
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat(request: Request):
+        override = await behave("openai", "chat/completions")
+        if override is not None:
+            return override
+        return chat_completion(await request.json())
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": dict(app.state.requests), "errors": dict(app.state.errors)}
+
+    return app
+
+def serve_in_thread(app, port):
+    # Runs the stubs next to the code under test; call server.should_exit = True to stop
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Stub server failed to start on port {port}")
+        time.sleep(0.05)
+    return server, thread
+
+def parse_overrides(values, cast):
+    overrides = {}
+    for value in values or []:
+        provider, _, amount = value.partition("=")
+        if provider not in PROVIDERS:
+            raise argparse.ArgumentTypeError(f"Unknown provider '{provider}', expected one of {PROVIDERS}")
+        overrides[provider] = cast(amount)
+    return overrides
+
+def add_stub_arguments(parser):
+    parser.add_argument("--latency", nargs="*", metavar="PROVIDER=MS", help="Mean latency per provider")
+    parser.add_argument("--error-rate", nargs="*", metavar="PROVIDER=RATE", help="Share of failed requests")
+    parser.add_argument("--replay-dir", help="Serve recorded <provider>/<path>.json files when present")
+    parser.add_argument("--stub-seed", type=int, default=0)
+
+def app_from_args(args):
+    return create_app(
+        latency_ms=parse_overrides(args.latency, float),
+        error_rate=parse_overrides(args.error_rate, float),
+        seed=args.stub_seed,
+        replay_dir=args.replay_dir,
+    )
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for FMP, NewsAPI and OpenAI.")
+    parser.add_argument("--port", type=int, default=8900)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    for name, value in env_urls(f"http://127.0.0.1:{args.port}").items():
+        print(f"export {name}={value}")
+    uvicorn.run(app_from_args(args), host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
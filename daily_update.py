@@ -1,9 +1,18 @@
 import os
-import psycopg2
-from datetime import datetime, timedelta, time, date
+import asyncio
+from datetime import datetime, time, date
+import httpx
 import openai
-import requests
 from dotenv import load_dotenv
+from db import connect, forecast_day_row, write_days
+from features import extract_pre_market_features
+from fetch import aget_json, endpoint_ttl, is_past
+from forecast_cache import forecast_key, load_forecast, parse_forecast, store_forecast
+from news_ranking import rank_headlines
+from sentiment import score_articles
+from telemetry import annotate_run, count, run_record, span
+from price_store import aupdate_daily, daily_store
+from trading_calendar import is_trading_day, previous_trading_day
 
 # Load environment variables
 load_dotenv()
@@ -12,106 +21,115 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 FMP_API_KEY = os.getenv("FMP_API_KEY")
 
-# Timezone helpers
-def is_market_open(target_date):
-    print(f"[LOG] Checking if the market is open on {target_date}")
-    url = f"https://financialmodelingprep.com/api/v3/is-the-market-open"
-    params = {"exchange": "NYSE", "apikey": FMP_API_KEY}
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        return data.get("isTheStockMarketOpen", False)
-    print(f"⚠️ Failed to fetch market status. Status code: {response.status_code}")
-    return False
-
-def get_closing_date(target_date):
-    while True:
-        print(f"[LOG] Checking if market was open on {target_date}")
-        if is_market_open(target_date):
-            return target_date
-        target_date -= timedelta(days=1)
+OPENAI_MODEL = "gpt-3.5-turbo"
+OPENAI_TEMPERATURE = 0.4
+FORECAST_ATTEMPTS = 2
+# Seconds per OpenAI call; the SDK's own retries are capped so a stuck call can't stall the job
+OPENAI_TIMEOUT = 30
+OPENAI_MAX_RETRIES = 1
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1200"))
 
-# Fetch financial indicators
-def fetch_fmp_json(endpoint, params):
-    response = requests.get(f"https://financialmodelingprep.com/api/v3/{endpoint}", params={**params, "apikey": FMP_API_KEY})
-    return response.json()
+# Overridable so the jobs can run against local stand-ins (see benchmarks/stub_servers.py);
+# the OpenAI SDK reads OPENAI_BASE_URL itself
+FMP_BASE_URL = os.getenv("FMP_BASE_URL", "https://financialmodelingprep.com/api/v3/")
+NEWS_API_BASE_URL = os.getenv("NEWS_API_BASE_URL", "https://newsapi.org/v2/")
 
-def fetch_pre_market_signals():
-    futures = fetch_fmp_json("quote/%5ESPX", {})  # S&P 500 futures
-    currencies = fetch_fmp_json("quote/USD", {})  # USD index or currency indicators
-    world_indices = fetch_fmp_json("quotes/index", {})  # Get global indices
+# One pooled async session per provider, shared by every fetch of a run
+def fmp_session():
+    return httpx.AsyncClient(base_url=FMP_BASE_URL, params={"apikey": FMP_API_KEY})
 
-    return {
-        "futures": futures,
-        "currencies": currencies,
-        "world_indices": world_indices,
-    }
+def news_session():
+    return httpx.AsyncClient(base_url=NEWS_API_BASE_URL, params={"apiKey": NEWS_API_KEY})
 
-def fetch_vt_close_data(closing_day: date):
-    history = fetch_fmp_json("historical-price-full/VT", {"serietype": "line", "timeseries": 10})
-    for row in history.get("historical", []):
-        if row["date"] == closing_day.strftime("%Y-%m-%d"):
-            return row
-    return None
+# One OpenAI client per process, so scheduled runs reuse its connection pool
+_openai_client = None
 
-# Fetch news headlines
-def fetch_news_for_period(since: datetime, until: datetime):
-    try:
-        response = requests.get("https://newsapi.org/v2/everything", params={
-            "q": "stock market OR global economy OR inflation OR interest rates OR business",
-            "from": since.isoformat(),
-            "to": until.isoformat(),
-            "language": "en",
-            "sortBy": "relevancy",
-            "pageSize": 100,
-            "apiKey": NEWS_API_KEY
-        })
-        response.raise_for_status()
-        return response.json().get("articles", [])
-    except requests.RequestException as e:
-        print(f"❌ Error fetching news: {e}")
-        return []
+def openai_client():
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = openai.OpenAI(api_key=OPENAI_API_KEY, timeout=OPENAI_TIMEOUT, max_retries=OPENAI_MAX_RETRIES)
+    return _openai_client
 
-def run_forecast_update():
-    connection = psycopg2.connect(DATABASE_URL)
-    cursor = connection.cursor()
+# Fetch financial indicators
+async def fetch_fmp_json(fmp, endpoint, params, immutable=False, hedge=False):
+    return await aget_json(fmp, endpoint, params, immutable=immutable, hedge=hedge)
 
-    now = datetime.utcnow()
-    forecast_day = now.date()
+async def fetch_pre_market_signals(fmp):
+    with span("fetch_pre_market"):
+        # Quotes are small and cheap, so a slow one is hedged with a duplicate
+        futures, currencies, world_indices = await asyncio.gather(
+            fetch_fmp_json(fmp, "quote/%5ESPX", {}, hedge=True),  # S&P 500 futures
+            fetch_fmp_json(fmp, "quote/USD", {}, hedge=True),  # USD index or currency indicators
+            fetch_fmp_json(fmp, "quotes/index", {}, hedge=True),  # Get global indices
+        )
 
-    # Stop execution if the market is closed
-    if not is_market_open(forecast_day):
-        print(f"[LOG] Market is closed on {forecast_day}. Stopping execution.")
-        cursor.close()
-        connection.close()
-        return
+    # Only a compact feature vector goes into the prompt, not the raw quotes
+    return extract_pre_market_features(futures, currencies, world_indices)
 
-    closing_day = get_closing_date(forecast_day - timedelta(days=1))
-    print(f"[LOG] Starting forecast update for Forecast Day: {forecast_day}, Closing Day: {closing_day}")
+async def fetch_vt_close_data(fmp, closing_day: date):
+    # A stored close is final; otherwise only daily bars newer than the last stored one are downloaded
+    store = daily_store()
+    close = store.close_on(closing_day)
+    if close is None:
+        with span("fetch_vt_close"):
+            await aupdate_daily(fmp, store)
+        close = store.close_on(closing_day)
+    if close is None:
+        return None
+    return {"date": closing_day.strftime("%Y-%m-%d"), "close": close}
 
+# The news window ends on a boundary of the `everything` cache TTL, so reruns
+# within the same bucket send the same params and reuse the cached response
+NEWS_BUCKET_MINUTES = max(endpoint_ttl("everything") // 60, 1)
+
+def news_window_end(now: datetime):
+    minute = now.minute - now.minute % NEWS_BUCKET_MINUTES
+    return now.replace(minute=minute, second=0, microsecond=0)
+
+# Fetch news headlines
+async def fetch_news_for_period(news, since: datetime, until: datetime, throttle=None):
     try:
-        # Gather data
-        vt_data = fetch_vt_close_data(closing_day)
-        if vt_data is None:
-            print(f"⚠️ No closing price found for {closing_day}. Skipping database update for closing price.")
+        with span("fetch_news") as attributes:
+            data = await aget_json(news, "everything", {
+                "q": "stock market OR global economy OR inflation OR interest rates OR business",
+                "from": since.isoformat(),
+                "to": until.isoformat(),
+                "language": "en",
+                "sortBy": "relevancy",
+                "pageSize": 100,
+            }, immutable=is_past(until.date()), throttle=throttle)
+            attributes["articles"] = len(data.get("articles", []))
+        return data.get("articles", [])
+    except httpx.HTTPError as e:
+        print(f"❌ Error fetching news: {e}")
+        return []
 
-        pre_market = fetch_pre_market_signals()
+# Gather every input of the forecast concurrently; the critical path is the slowest fetch
+async def gather_forecast_inputs(forecast_day: date, closing_day: date, now: datetime):
+    # Fetch news from the closing day (4:30 PM NYC time) to the current time
+    nyc_closing_time = datetime.combine(closing_day, time(16, 30))
 
-        # Fetch news from the closing day (4:30 PM NYC time) to the current time
-        nyc_closing_time = datetime.combine(closing_day, time(16, 30))
-        news_articles = fetch_news_for_period(since=nyc_closing_time, until=now)
+    async with fmp_session() as fmp, news_session() as news:
+        vt_data, pre_market, news_articles = await asyncio.gather(
+            fetch_vt_close_data(fmp, closing_day),
+            fetch_pre_market_signals(fmp),
+            fetch_news_for_period(news, since=nyc_closing_time, until=news_window_end(now)),
+        )
 
-        headlines = [a["title"] for a in news_articles if "title" in a][:10]
-        if not headlines:
-            print("⚠️ No valid headlines")
-            connection.close()
-            return
+    return {
+        "vt_data": vt_data,
+        "pre_market": pre_market,
+        "news_articles": news_articles,
+    }
 
-        prompt = f"""
+# Build the forecasting prompt; the backfill also passes the day's open data
+def build_prompt(forecast_day: date, vt_data, pre_market, headlines, vt_open_data=None):
+    open_line = f"Today's VT open data: {vt_open_data}\n        " if vt_open_data else ""
+    return f"""
         You are an economic assistant forecasting the VT ETF daily movement.
         Today's date: {forecast_day}.
         Yesterday's VT data: {vt_data}
-        Pre-market signals: {pre_market}
+        {open_line}Pre-market signals: {pre_market}
         News headlines:
         {chr(10).join(f"- {title}" for title in headlines)}
 
@@ -126,77 +144,136 @@ def run_forecast_update():
         }}
         """
 
-        # Call OpenAI
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
+def estimate_tokens(text):
+    # ~4 characters per token for English text, close enough for a budget check
+    return len(text) // 4 + 1
+
+# Drop the least relevant (last) headlines until the prompt fits the token budget
+def build_prompt_within_budget(forecast_day: date, vt_data, pre_market, headlines, vt_open_data=None):
+    headlines = list(headlines)
+    prompt = build_prompt(forecast_day, vt_data, pre_market, headlines, vt_open_data)
+    while estimate_tokens(prompt) > PROMPT_TOKEN_BUDGET and len(headlines) > 1:
+        headlines.pop()
+        prompt = build_prompt(forecast_day, vt_data, pre_market, headlines, vt_open_data)
+
+    tokens = estimate_tokens(prompt)
+    if tokens > PROMPT_TOKEN_BUDGET:
+        raise ValueError(f"Prompt needs ~{tokens} tokens, over the {PROMPT_TOKEN_BUDGET} token budget")
+    print(f"[LOG] Prompt size ~{tokens} tokens with {len(headlines)} headlines")
+    return prompt
+
+# Call OpenAI in JSON mode; a malformed answer is retried instead of failing the run
+def request_forecast(client, prompt):
+    for attempt in range(1, FORECAST_ATTEMPTS + 1):
         response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+            model=OPENAI_MODEL,
             messages=[{"role": "user", "content": prompt}],
-            temperature=0.4,
-            max_tokens=500
+            temperature=OPENAI_TEMPERATURE,
+            max_tokens=500,
+            response_format={"type": "json_object"},
         )
+        if response.usage:
+            count("ai4vt_openai_tokens_total", response.usage.prompt_tokens, kind="prompt")
+            count("ai4vt_openai_tokens_total", response.usage.completion_tokens, kind="completion")
 
         response_text = response.choices[0].message.content.strip()
-        parsed = eval(response_text)  # Can replace with json.loads if LLM is stable
+        try:
+            return parse_forecast(response_text)
+        except (ValueError, TypeError) as e:
+            print(f"⚠️ Invalid forecast response (attempt {attempt}/{FORECAST_ATTEMPTS}): {e}")
+    raise ValueError("No valid forecast returned by the model")
 
-        print(f"✅ Forecast: {parsed}")
+# Identical prompt inputs reuse the stored forecast instead of calling OpenAI again
+def cached_forecast(cursor, client, prompt, inputs):
+    key = forecast_key(OPENAI_MODEL, OPENAI_TEMPERATURE, inputs)
+    with span("forecast") as attributes:
+        cached = load_forecast(cursor, key)
+        attributes["cached"] = cached is not None
+        if cached is not None:
+            print("[LOG] Prompt inputs unchanged, reusing cached forecast")
+            return cached
 
-        # Ensure daily_data is updated first before inserting into predictions and headlines
-        print("[LOG] Ensuring date exists in daily_data table")
-        cursor.execute(
-            """
-            INSERT INTO daily_data (date)
-            VALUES (%s)
-            ON CONFLICT (date) DO NOTHING
-            """,
-            (forecast_day,)
-        )
+        parsed = request_forecast(client, prompt)
+        store_forecast(cursor, key, OPENAI_MODEL, parsed)
+    return parsed
 
-        # Update daily_data with any new data if available
-        if vt_data:
-            print("[LOG] Updating daily_data with new data if available")
-            cursor.execute(
-                """
-                UPDATE daily_data
-                SET close_yesterday = %s
-                WHERE date = %s
-                """,
-                (vt_data["close"], forecast_day)
-            )
-
-        # Proceed with inserting into predictions and headlines
-        print("[LOG] Writing forecast to database")
-        cursor.execute(
-            """
-            INSERT INTO predictions (date, forecasted_pct, confidence_level, volatility_indicator, average_pct)
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (date) DO UPDATE SET
-              forecasted_pct = EXCLUDED.forecasted_pct,
-              confidence_level = EXCLUDED.confidence_level,
-              volatility_indicator = EXCLUDED.volatility_indicator,
-              average_pct = EXCLUDED.average_pct
-            """,
-            (
-                forecast_day,
-                parsed["forecasted_pct"],
-                parsed["confidence_level"],
-                parsed["volatility_indicator"],
-                parsed["forecasted_pct"]
-            )
-        )
+def save_forecast(cursor, forecast_day: date, parsed, close_yesterday=None, open_today=None, scores=None):
+    # daily_data, predictions and headlines are written in a single statement
+    print("[LOG] Writing forecast to database")
+    row = forecast_day_row(forecast_day, parsed, close_yesterday, open_today, scores)
+    with span("db_write"):
+        return write_days(cursor, [row])
 
-        cursor.execute(
-            """
-            INSERT INTO headlines (date, headline)
-            VALUES (%s, %s)
-            ON CONFLICT (date) DO UPDATE SET headline = EXCLUDED.headline
-            """,
-            (forecast_day, parsed["headline_summary"])
-        )
+@run_record("forecast_update")
+def run_forecast_update(now=None):
+    connection = connect()
+    cursor = connection.cursor()
+
+    now = now or datetime.utcnow()
+    forecast_day = now.date()
+    annotate_run(day=forecast_day)
+
+    # Stop execution if the market is closed
+    if not is_trading_day(forecast_day):
+        print(f"[LOG] Market is closed on {forecast_day}. Stopping execution.")
+        annotate_run(status="skipped")
+        cursor.close()
+        connection.close()
+        return
+
+    closing_day = previous_trading_day(forecast_day)
+    print(f"[LOG] Starting forecast update for Forecast Day: {forecast_day}, Closing Day: {closing_day}")
+
+    try:
+        # Gather data
+        with span("gather_inputs"):
+            inputs = asyncio.run(gather_forecast_inputs(forecast_day, closing_day, now))
+        vt_data = inputs["vt_data"]
+        if vt_data is None:
+            print(f"⚠️ No closing price found for {closing_day}. Skipping database update for closing price.")
+
+        pre_market = inputs["pre_market"]
+        news_articles = inputs["news_articles"]
 
+        # Top distinct, market-relevant headlines instead of the first ten returned
+        with span("rank_headlines"):
+            headlines = rank_headlines(news_articles)
+        if not headlines:
+            print("⚠️ No valid headlines")
+            annotate_run(status="skipped")
+            connection.close()
+            return
+
+        with span("build_prompt"):
+            prompt = build_prompt_within_budget(forecast_day, vt_data, pre_market, headlines)
+
+        client = openai_client()
+        inputs = {
+            "forecast_day": forecast_day,
+            "vt_data": vt_data,
+            "pre_market": pre_market,
+            "headlines": headlines,
+        }
+        parsed = cached_forecast(cursor, client, prompt, inputs)
+        connection.commit()
+
+        print(f"✅ Forecast: {parsed}")
+
+        # Sentiment and impact come from a local lexicon over every fetched article
+        with span("sentiment"):
+            scores = score_articles(news_articles)
+        print(f"[LOG] Scores: {scores}")
+
+        save_forecast(
+            cursor, forecast_day, parsed,
+            close_yesterday=vt_data["close"] if vt_data else None,
+            scores=scores,
+        )
         connection.commit()
 
     except Exception as e:
         print(f"❌ Error: {e}")
+        annotate_run(status="error", error=str(e))
     finally:
         cursor.close()
         connection.close()
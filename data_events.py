@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+# Postgres NOTIFY channel shared by the writers (jobs) and the API listener
+DATA_CHANNEL = "vt_data_changed"
+
+# — Writer side (psycopg2 cursors) —
+def notify_data_changed(cursor, table, day, days=1):
+    # pg_notify is transactional: listeners only hear about it after COMMIT.
+    # `days` > 1 tells listeners that more than the one `day` changed.
+    payload = json.dumps({"table": table, "date": str(day), "days": days})
+    cursor.execute("SELECT pg_notify(%s, %s)", (DATA_CHANNEL, payload))
+
+def decode_payload(payload):
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        event = None
+    return event if isinstance(event, dict) else {}
+
+# — Fan-out to in-process subscribers —
+class Broadcaster:
+    # One bounded queue per subscriber; a subscriber that falls behind loses its
+    # backlog and gets a single `overflow_event` instead of blocking everyone else
+    def __init__(self, queue_size=100, overflow_event=None):
+        self.queue_size = queue_size
+        self.overflow_event = overflow_event or {"type": "resync"}
+        self.subscribers = set()
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, event):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.overflow_event)
+
+# — API side (dedicated asyncpg connection) —
+# After a lost connection the listener keeps retrying, waiting this long (doubling) in between
+RECONNECT_MIN_SECONDS = 1
+RECONNECT_MAX_SECONDS = 60
+
+class DataVersionListener:
+    def __init__(self, dsn, channel=DATA_CHANNEL):
+        self.dsn = dsn
+        self.channel = channel
+        self.version = 0
+        self.connection = None
+        self.reconnect_task = None
+        # Every notification is also published here (parsed payload + version)
+        self.changes = Broadcaster()
+
+    @property
+    def is_listening(self):
+        return self.connection is not None and not self.connection.is_closed()
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self.version += 1
+        self.changes.publish({**decode_payload(payload), "version": self.version})
+
+    def _on_termination(self, connection):
+        print("⚠️ Lost LISTEN connection, falling back to polling the data version")
+        self.connection = None
+        # Subscribers can no longer trust they have every change
+        self.changes.publish({"type": "resync"})
+        self._schedule_reconnect()
+
+    def _schedule_reconnect(self):
+        if self.reconnect_task is None or self.reconnect_task.done():
+            self.reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _connect(self):
+        import asyncpg
+
+        try:
+            connection = await asyncpg.connect(self.dsn)
+            connection.add_termination_listener(self._on_termination)
+            await connection.add_listener(self.channel, self._on_notify)
+        except (OSError, asyncpg.PostgresError, asyncio.TimeoutError) as e:
+            print(f"⚠️ Could not LISTEN on '{self.channel}': {e}")
+            return False
+        self.connection = connection
+        print(f"[LOG] Listening for data changes on '{self.channel}'")
+        return True
+
+    async def _reconnect(self):
+        delay = RECONNECT_MIN_SECONDS
+        while True:
+            await asyncio.sleep(delay)
+            if await self._connect():
+                break
+            delay = min(delay * 2, RECONNECT_MAX_SECONDS)
+        # Changes committed while we were away were never heard: have everyone reload
+        self.version += 1
+        self.changes.publish({"type": "refresh", "version": self.version})
+
+    async def start(self):
+        # Never fails: without a connection the API polls until a retry succeeds
+        if not await self._connect():
+            self._schedule_reconnect()
+
+    async def stop(self):
+        if self.reconnect_task:
+            self.reconnect_task.cancel()
+            self.reconnect_task = None
+        if self.is_listening:
+            # A deliberate close is not a lost connection
+            self.connection.remove_termination_listener(self._on_termination)
+            await self.connection.close()
+        self.connection = None
@@ -0,0 +1,219 @@
+import os
+import json
+import sqlalchemy
+from sqlalchemy.dialects import postgresql
+from dotenv import load_dotenv
+from data_events import DATA_CHANNEL
+from results_table import ensure_results_table, upsert_results_cte
+
+# Shared persistence layer for the API and the jobs: table definitions, a pooled
+# engine for the jobs and single-statement batched upserts that run on either a
+# pooled psycopg2 cursor or the API's async `databases` engine.
+
+# — Load environment variables —
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+
+metadata = sqlalchemy.MetaData()
+
+# — Define your tables —
+daily_data = sqlalchemy.Table(
+    "daily_data", metadata,
+    sqlalchemy.Column("date", sqlalchemy.Date, primary_key=True),
+    sqlalchemy.Column("close_yesterday", sqlalchemy.Numeric),
+    sqlalchemy.Column("open_today", sqlalchemy.Numeric),
+    sqlalchemy.Column("real_move_pct", sqlalchemy.Numeric),
+)
+
+predictions = sqlalchemy.Table(
+    "predictions", metadata,
+    sqlalchemy.Column("date", sqlalchemy.Date, sqlalchemy.ForeignKey("daily_data.date"), primary_key=True),
+    sqlalchemy.Column("sentiment_score", sqlalchemy.Integer),
+    sqlalchemy.Column("market_impact_score", sqlalchemy.Integer),
+    sqlalchemy.Column("confidence_level", sqlalchemy.Integer),
+    sqlalchemy.Column("volatility_indicator", sqlalchemy.String),
+    sqlalchemy.Column("forecasted_pct", sqlalchemy.Numeric),
+    sqlalchemy.Column("calculated_pct", sqlalchemy.Numeric),
+    sqlalchemy.Column("average_pct", sqlalchemy.Numeric),
+    sqlalchemy.Column("correct", sqlalchemy.Boolean),
+)
+
+summaries = sqlalchemy.Table(
+    "headlines", metadata,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("date", sqlalchemy.Date),
+    sqlalchemy.Column("headline", sqlalchemy.Text),
+)
+
+# Read model kept in step by every writer (see results_table.py)
+results = sqlalchemy.Table(
+    "results", metadata,
+    sqlalchemy.Column("date", sqlalchemy.Date, primary_key=True),
+    sqlalchemy.Column("close_yesterday", sqlalchemy.Float),
+    sqlalchemy.Column("open_today", sqlalchemy.Float),
+    sqlalchemy.Column("real_move_pct", sqlalchemy.Float),
+    sqlalchemy.Column("sentiment_score", sqlalchemy.Integer),
+    sqlalchemy.Column("market_impact_score", sqlalchemy.Integer),
+    sqlalchemy.Column("confidence_level", sqlalchemy.Integer),
+    sqlalchemy.Column("volatility_indicator", sqlalchemy.Text),
+    sqlalchemy.Column("forecasted_pct", sqlalchemy.Float),
+    sqlalchemy.Column("calculated_pct", sqlalchemy.Float),
+    sqlalchemy.Column("average_pct", sqlalchemy.Float),
+    sqlalchemy.Column("correct", sqlalchemy.Boolean),
+    sqlalchemy.Column("summary", sqlalchemy.Text),
+)
+
+metrics_aggregates = sqlalchemy.Table(
+    "metrics_aggregates", metadata,
+    sqlalchemy.Column("bucket", sqlalchemy.Text, primary_key=True),
+    sqlalchemy.Column("days", sqlalchemy.Integer),
+    sqlalchemy.Column("hits", sqlalchemy.Integer),
+    sqlalchemy.Column("sum_abs_error", sqlalchemy.Numeric),
+    sqlalchemy.Column("recent_hits", sqlalchemy.Text),
+    sqlalchemy.Column("last_date", sqlalchemy.Date),
+)
+
+# — Connection pool for the jobs —
+_engine = None
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        if not DATABASE_URL:
+            raise RuntimeError("DATABASE_URL not set")
+        # The jobs ship psycopg2; newer SQLAlchemy releases default postgresql:// to psycopg 3
+        url = sqlalchemy.engine.make_url(DATABASE_URL).set(drivername="postgresql+psycopg2")
+        _engine = sqlalchemy.create_engine(url, pool_size=DB_POOL_SIZE, pool_pre_ping=True)
+    return _engine
+
+def connect():
+    # A pooled psycopg2 connection; close() hands it back to the pool
+    return get_engine().raw_connection()
+
+# — Batched day upserts —
+# Column name -> SQL type of every field a writer can set for a day.
+# Fields left out (or None) never overwrite values already stored.
+DAY_FIELDS = {
+    "date": "date",
+    "close_yesterday": "numeric",
+    "open_today": "numeric",
+    "forecasted_pct": "numeric",
+    "confidence_level": "integer",
+    "volatility_indicator": "text",
+    "average_pct": "numeric",
+    "sentiment_score": "integer",
+    "market_impact_score": "integer",
+    "headline": "text",
+}
+
+UPSERT_DAYS_SQL = """
+WITH input ({fields}) AS (
+    VALUES {rows}
+),
+upsert_daily AS (
+    INSERT INTO daily_data (date, close_yesterday, open_today)
+    SELECT date, close_yesterday, open_today FROM input
+    ON CONFLICT (date) DO UPDATE SET
+      close_yesterday = COALESCE(EXCLUDED.close_yesterday, daily_data.close_yesterday),
+      open_today = COALESCE(EXCLUDED.open_today, daily_data.open_today)
+    RETURNING *
+),
+upsert_predictions AS (
+    INSERT INTO predictions (date, forecasted_pct, confidence_level, volatility_indicator, average_pct,
+                             sentiment_score, market_impact_score)
+    SELECT date, forecasted_pct, confidence_level, volatility_indicator, average_pct,
+           sentiment_score, market_impact_score FROM input
+    WHERE forecasted_pct IS NOT NULL
+    ON CONFLICT (date) DO UPDATE SET
+      forecasted_pct = EXCLUDED.forecasted_pct,
+      confidence_level = EXCLUDED.confidence_level,
+      volatility_indicator = EXCLUDED.volatility_indicator,
+      average_pct = EXCLUDED.average_pct,
+      sentiment_score = COALESCE(EXCLUDED.sentiment_score, predictions.sentiment_score),
+      market_impact_score = COALESCE(EXCLUDED.market_impact_score, predictions.market_impact_score)
+    RETURNING *
+),
+upsert_headlines AS (
+    INSERT INTO headlines (date, headline)
+    SELECT date, headline FROM input
+    WHERE headline IS NOT NULL
+    ON CONFLICT (date) DO UPDATE SET headline = EXCLUDED.headline
+    RETURNING *
+),
+{upsert_results}
+SELECT
+  (SELECT count(*) FROM upsert_daily) AS daily_data,
+  (SELECT count(*) FROM upsert_predictions) AS predictions,
+  (SELECT count(*) FROM upsert_headlines) AS headlines,
+  pg_notify(:channel, :payload) AS notified
+"""
+
+# The results read model for every written day, built from the rows written above
+UPSERT_DAYS_RESULTS = upsert_results_cte(
+    "input", daily="upsert_daily", predictions="upsert_predictions", headlines="upsert_headlines"
+)
+
+def merge_days(days):
+    # ON CONFLICT can't touch the same row twice in one statement: fold duplicates per date
+    merged = {}
+    for day in days:
+        current = merged.setdefault(day["date"], {})
+        current.update({k: v for k, v in day.items() if v is not None})
+    return [merged[d] for d in sorted(merged)]
+
+def upsert_days_statement(days, table="predictions"):
+    days = merge_days(days)
+    if not days:
+        raise ValueError("No days to write")
+
+    rows = []
+    params = {}
+    for i, day in enumerate(days):
+        unknown = set(day) - set(DAY_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown day fields: {sorted(unknown)}")
+        placeholders = []
+        for field, sql_type in DAY_FIELDS.items():
+            name = f"{field}_{i}"
+            params[name] = day.get(field)
+            placeholders.append(f"CAST(:{name} AS {sql_type})")
+        rows.append(f"({', '.join(placeholders)})")
+
+    params["channel"] = DATA_CHANNEL
+    params["payload"] = json.dumps({"table": table, "date": str(days[-1]["date"]), "days": len(days)})
+    sql = UPSERT_DAYS_SQL.format(
+        fields=", ".join(DAY_FIELDS),
+        rows=",\n    ".join(rows),
+        upsert_results=UPSERT_DAYS_RESULTS,
+    )
+    return sqlalchemy.text(sql).bindparams(**params)
+
+def write_days(cursor, days, table="predictions"):
+    # One round trip for any number of days, on a psycopg2 cursor (see connect())
+    ensure_results_table()
+    compiled = upsert_days_statement(days, table).compile(dialect=postgresql.psycopg2.dialect())
+    cursor.execute(str(compiled), compiled.params)
+    counts = cursor.fetchone()
+    return {"daily_data": counts[0], "predictions": counts[1], "headlines": counts[2]}
+
+async def awrite_days(database, days, table="predictions"):
+    # Same statement on the API's async `databases` engine
+    row = await database.fetch_one(upsert_days_statement(days, table))
+    return {"daily_data": row["daily_data"], "predictions": row["predictions"], "headlines": row["headlines"]}
+
+def forecast_day_row(forecast_day, parsed, close_yesterday=None, open_today=None, scores=None):
+    scores = scores or {}
+    return {
+        "date": forecast_day,
+        "close_yesterday": close_yesterday,
+        "open_today": open_today,
+        "forecasted_pct": parsed["forecasted_pct"],
+        "confidence_level": parsed["confidence_level"],
+        "volatility_indicator": parsed["volatility_indicator"],
+        "average_pct": parsed["forecasted_pct"],
+        "sentiment_score": scores.get("sentiment_score"),
+        "market_impact_score": scores.get("market_impact_score"),
+        "headline": parsed["headline_summary"],
+    }
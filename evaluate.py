@@ -0,0 +1,138 @@
+from datetime import date
+import numpy as np
+from results_table import ensure_results_table, upsert_results_cte
+
+# Forecast evaluation: loads daily_data + predictions as arrays and derives
+#   daily_data.real_move_pct    close-to-open move, (open_today - close_yesterday) / close_yesterday * 100
+#   predictions.calculated_pct  forecast error in percentage points, real_move_pct - forecasted_pct
+#   predictions.correct         whether the forecast called the direction of the move
+# Only rows whose stored values differ are written back, in a single statement
+# that also refreshes those days in the results read model.
+
+# Stored values are rounded so float noise never counts as a change
+PRECISION = 6
+
+LOAD_SQL = """
+SELECT d.date, d.close_yesterday, d.open_today, d.real_move_pct,
+       p.forecasted_pct, p.calculated_pct, p.correct
+FROM daily_data d
+LEFT JOIN predictions p ON p.date = d.date
+{where}
+ORDER BY d.date
+"""
+
+# Days that still miss a value they could have
+PENDING_WHERE = """
+WHERE (d.real_move_pct IS NULL AND d.open_today IS NOT NULL AND d.close_yesterday IS NOT NULL)
+   OR (p.forecasted_pct IS NOT NULL AND (p.correct IS NULL OR p.calculated_pct IS NULL))
+"""
+
+WRITE_SQL = """
+WITH input (date, real_move_pct, calculated_pct, correct) AS (
+    SELECT * FROM unnest(%s::date[], %s::numeric[], %s::numeric[], %s::boolean[])
+),
+update_daily AS (
+    UPDATE daily_data d SET real_move_pct = i.real_move_pct
+    FROM input i
+    WHERE d.date = i.date AND d.real_move_pct IS DISTINCT FROM i.real_move_pct
+    RETURNING d.*
+),
+update_predictions AS (
+    UPDATE predictions p SET calculated_pct = i.calculated_pct, correct = i.correct
+    FROM input i
+    WHERE p.date = i.date
+      AND (p.calculated_pct IS DISTINCT FROM i.calculated_pct OR p.correct IS DISTINCT FROM i.correct)
+    RETURNING p.*
+),
+{upsert_results}
+SELECT (SELECT count(*) FROM update_daily), (SELECT count(*) FROM update_predictions)
+""".format(upsert_results=upsert_results_cte("input", daily="update_daily", predictions="update_predictions"))
+
+def _floats(values):
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=float)
+
+def _same(a, b):
+    return (a == b) | (np.isnan(a) & np.isnan(b))
+
+def compute(close_yesterday, open_today, forecasted_pct):
+    # All arrays are float with NaN for missing values
+    valid = ~np.isnan(close_yesterday) & ~np.isnan(open_today) & (close_yesterday != 0)
+    real = np.full(len(close_yesterday), np.nan)
+    real[valid] = (open_today[valid] - close_yesterday[valid]) / close_yesterday[valid] * 100
+    real = np.round(real, PRECISION)
+
+    scored = ~np.isnan(real) & ~np.isnan(forecasted_pct)
+    calculated = np.where(scored, np.round(real - forecasted_pct, PRECISION), np.nan)
+    correct = (forecasted_pct >= 0) == (real >= 0)
+    return real, calculated, correct, scored
+
+def load(cursor, full=False, since: date | None = None):
+    if full:
+        where = ""
+    elif since is not None:
+        where = cursor.mogrify("WHERE d.date >= %s", (since,)).decode()
+    else:
+        where = PENDING_WHERE
+    cursor.execute(LOAD_SQL.format(where=where))
+    return cursor.fetchall()
+
+def evaluate(cursor, full=False, since: date | None = None):
+    # Default: only days still missing a value. `since`: every day from that date. `full`: all history.
+    rows = load(cursor, full, since)
+    if not rows:
+        return {"daily_data": 0, "predictions": 0, "last_date": None, "scored": []}
+
+    dates, close, open_, stored_real, forecast, stored_calc, stored_correct = zip(*rows)
+    real, calculated, correct, scored = compute(_floats(close), _floats(open_), _floats(forecast))
+
+    stored_real = np.round(_floats(stored_real), PRECISION)
+    stored_calc = np.round(_floats(stored_calc), PRECISION)
+    stored_correct = np.array([np.nan if v is None else float(v) for v in stored_correct])
+    new_correct = np.where(scored, correct.astype(float), np.nan)
+    has_prediction = np.array([f is not None for f in forecast])
+
+    changed = ~_same(real, stored_real) | (
+        has_prediction & (~_same(calculated, stored_calc) | ~_same(new_correct, stored_correct))
+    )
+    if not changed.any():
+        return {"daily_data": 0, "predictions": 0, "last_date": None, "scored": []}
+
+    index = np.flatnonzero(changed)
+    ensure_results_table()
+    cursor.execute(WRITE_SQL, (
+        [dates[i] for i in index],
+        [None if np.isnan(real[i]) else float(real[i]) for i in index],
+        [None if np.isnan(calculated[i]) else float(calculated[i]) for i in index],
+        [bool(correct[i]) if scored[i] else None for i in index],
+    ))
+    daily_count, prediction_count = cursor.fetchone()
+    print(f"[LOG] Evaluated {len(rows)} days, updated {daily_count} daily_data and {prediction_count} predictions rows")
+    return {
+        "daily_data": daily_count,
+        "predictions": prediction_count,
+        "last_date": dates[index[-1]],
+        # Forecast days whose score changed (newly scored, rescored or no longer scorable), in date order
+        "scored": [dates[i] for i in index if has_prediction[i]],
+    }
+
+if __name__ == "__main__":
+    import argparse
+    from db import connect
+    from data_events import notify_data_changed
+    from metrics import rebuild_metrics
+
+    parser = argparse.ArgumentParser(description="Compute real moves, forecast errors and correctness.")
+    parser.add_argument("--full", action="store_true", help="Recompute the whole history")
+    args = parser.parse_args()
+
+    connection = connect()
+    cursor = connection.cursor()
+    counts = evaluate(cursor, full=args.full)
+    if counts["last_date"] is not None:
+        # Correctness changed, so the aggregates have to be refolded
+        rebuild_metrics(cursor)
+        changed = max(counts["daily_data"], counts["predictions"])
+        notify_data_changed(cursor, "predictions", counts["last_date"], days=changed)
+    connection.commit()
+    cursor.close()
+    connection.close()
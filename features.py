@@ -0,0 +1,59 @@
+import numpy as np
+
+# Pre-market feature extraction: the FMP futures, currency and world-index
+# payloads (hundreds of quotes) are reduced to a small fixed vector before they
+# go into the forecasting prompt.
+
+REGIONS = {
+    "americas": ["^GSPC", "^DJI", "^IXIC", "^RUT", "^GSPTSE", "^BVSP", "^MXX"],
+    "europe": ["^FTSE", "^GDAXI", "^FCHI", "^STOXX50E", "^IBEX", "^AEX", "^SSMI", "FTSEMIB.MI"],
+    "asia_pacific": ["^N225", "^HSI", "000001.SS", "^KS11", "^AXJO", "^BSESN", "^NSEI", "^TWII", "^STI"],
+}
+
+# Rounding keeps the vector stable between runs, which also helps the forecast cache
+PRECISION = 2
+
+def _quotes(payload):
+    return payload if isinstance(payload, list) else []
+
+def _change(quote):
+    value = quote.get("changesPercentage")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _round(value):
+    return None if value is None or np.isnan(value) else round(float(value), PRECISION)
+
+def first_change(payload):
+    quotes = _quotes(payload)
+    return _round(_change(quotes[0])) if quotes else None
+
+def world_index_features(world_indices):
+    quotes = _quotes(world_indices)
+    symbols = np.array([q.get("symbol", "") for q in quotes], dtype=object)
+    changes = np.array([_change(q) for q in quotes], dtype=float)
+    valid = ~np.isnan(changes)
+    symbols, changes = symbols[valid], changes[valid]
+
+    features = {}
+    for region, members in REGIONS.items():
+        in_region = np.isin(symbols, members)
+        features[f"{region}_pct"] = _round(changes[in_region].mean()) if in_region.any() else None
+
+    if len(changes):
+        features["world_mean_pct"] = _round(changes.mean())
+        features["world_dispersion"] = _round(changes.std())
+        features["breadth_up"] = _round((changes > 0).mean())
+    else:
+        features["world_mean_pct"] = features["world_dispersion"] = features["breadth_up"] = None
+    features["indices_count"] = int(len(changes))
+    return features
+
+def extract_pre_market_features(futures, currencies, world_indices):
+    return {
+        "spx_pct": first_change(futures),
+        "usd_pct": first_change(currencies),
+        **world_index_features(world_indices),
+    }
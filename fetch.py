@@ -0,0 +1,342 @@
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+from collections import defaultdict, deque
+from datetime import date
+from urllib.parse import urlsplit
+import httpx
+import requests
+from telemetry import count
+
+# Shared fetch layer for the FMP and NewsAPI calls.
+# Successful JSON responses are stored in a content-addressed disk cache keyed
+# by endpoint and params (API keys excluded), with a TTL per endpoint.
+# Responses that only cover past dates never change and are kept until evicted.
+# The cache is bounded in size and evicts least recently used entries.
+#
+# Every network call is latency-bounded: per-endpoint connect/read timeouts,
+# a few retries with jittered backoff drawn from a per-process retry budget,
+# optionally a hedged duplicate for async GETs that run past the endpoint's p95
+# (only worth it for small, cheap calls), and a per-host circuit breaker.
+# When a host is failing, cached data of any age is served instead of waiting on it.
+
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "http"))
+CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+# TTLs in seconds, matched on the longest endpoint prefix; unknown endpoints are not cached
+ENDPOINT_TTLS = {
+    "quote/": 60,
+    "quotes/index": 60,
+    "historical-price-full/": 6 * 60 * 60,
+    "historical-chart/": 60,
+    "everything": 15 * 60,
+}
+
+# (connect, read) timeouts in seconds, matched like the TTLs
+ENDPOINT_TIMEOUTS = {
+    "quote/": (3.05, 5),
+    "quotes/index": (3.05, 10),
+    "historical-price-full/": (3.05, 20),
+    "historical-chart/": (3.05, 20),
+    "everything": (3.05, 15),
+}
+DEFAULT_TIMEOUT = (3.05, 10)
+
+SECRET_PARAMS = {"apikey", "apiKey"}
+
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+# Retries (and hedges) may add at most this share of extra requests per process
+RETRY_BUDGET_RATIO = 0.2
+RETRY_BUDGET_MIN = 5
+
+# Hedge once a request runs longer than the endpoint's observed p95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY = 2.0
+LATENCY_WINDOW = 200
+
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60.0
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+def _match_prefix(table, url):
+    matches = [prefix for prefix in table if prefix in url]
+    return max(matches, key=len) if matches else None
+
+def endpoint_ttl(url):
+    prefix = _match_prefix(ENDPOINT_TTLS, url)
+    return ENDPOINT_TTLS[prefix] if prefix else 0
+
+def endpoint_timeout(url):
+    prefix = _match_prefix(ENDPOINT_TIMEOUTS, url)
+    return ENDPOINT_TIMEOUTS[prefix] if prefix else DEFAULT_TIMEOUT
+
+def is_past(day: date):
+    return day < date.today()
+
+def cache_key(url, params):
+    public = {k: str(v) for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+    raw = json.dumps([url, sorted(public.items())], separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def cache_path(key):
+    return os.path.join(CACHE_DIR, key[:2], key)
+
+def read_cache(key, ttl, immutable=False):
+    path = cache_path(key)
+    try:
+        stat = os.stat(path)
+        if not immutable and time.time() - stat.st_mtime > ttl:
+            return None
+        with open(path, "rb") as f:
+            body = f.read()
+        # Bump the access time for LRU eviction, keep mtime as the fetch time
+        os.utime(path, (time.time(), stat.st_mtime))
+        return body
+    except OSError:
+        return None
+
+def write_cache(key, body):
+    path = cache_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(body)
+    os.replace(tmp_path, path)
+    evict_cache()
+
+def evict_cache(max_bytes=CACHE_MAX_BYTES):
+    entries = []
+    total = 0
+    for root, _, files in os.walk(CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= max_bytes:
+            break
+
+def _lookup(url, params, ttl, immutable):
+    ttl = endpoint_ttl(url) if ttl is None else ttl
+    if not ttl and not immutable:
+        return None, None
+    key = cache_key(url, params)
+    body = read_cache(key, ttl, immutable)
+    return key, body
+
+def _stale(url, params):
+    # Last stored response regardless of age, for hosts that are failing
+    body = read_cache(cache_key(url, params), 0, immutable=True)
+    if body is not None:
+        count("ai4vt_fetch_requests_total", host=urlsplit(url).netloc, source="stale")
+        print(f"⚠️ Serving cached data for {urlsplit(url).path} while the host is failing")
+    return body
+
+# — Latency guards —
+class RetryBudget:
+    def __init__(self, ratio=RETRY_BUDGET_RATIO, minimum=RETRY_BUDGET_MIN):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.requests = 0
+        self.retries = 0
+
+    def record_request(self):
+        self.requests += 1
+
+    def try_spend(self):
+        if self.retries < self.minimum + self.ratio * self.requests:
+            self.retries += 1
+            return True
+        return False
+
+class CircuitBreaker:
+    # Opens after consecutive failures; after the cooldown requests go through
+    # again and the first success closes it
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+
+    def allow(self):
+        return self.opened_at is None or time.monotonic() - self.opened_at >= self.cooldown
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+class LatencyTracker:
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, key, seconds):
+        self.samples[key].append(seconds)
+
+    def p95(self, key):
+        samples = self.samples[key]
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return sorted(samples)[int(len(samples) * 0.95) - 1]
+
+retry_budget = RetryBudget()
+# Keep-alive connections for the sync client, reused across calls and scheduled runs
+session = requests.Session()
+breakers = defaultdict(CircuitBreaker)
+latencies = LatencyTracker()
+
+def backoff_delay(attempt):
+    # Full jitter: uniform between 0 and the capped exponential step
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def latency_key(url):
+    parts = urlsplit(url)
+    return parts.netloc + (_match_prefix(ENDPOINT_TIMEOUTS, url) or parts.path)
+
+def _record_hit(url):
+    count("ai4vt_fetch_requests_total", host=urlsplit(url).netloc, source="cache")
+
+def _record_download(url, response):
+    host = urlsplit(url).netloc
+    count("ai4vt_fetch_requests_total", host=host, source="network")
+    count("ai4vt_fetch_bytes_total", len(response.content), host=host)
+
+def _can_retry(attempt, breaker):
+    return attempt + 1 < MAX_ATTEMPTS and breaker.allow() and retry_budget.try_spend()
+
+# — Sync client (requests) —
+def get_json(url, params=None, ttl=None, immutable=False):
+    key, body = _lookup(url, params, ttl, immutable)
+    if body is not None:
+        _record_hit(url)
+        return json.loads(body)
+
+    breaker = breakers[urlsplit(url).netloc]
+    if not breaker.allow():
+        body = _stale(url, params)
+        if body is not None:
+            return json.loads(body)
+        raise requests.ConnectionError(f"Circuit open for {urlsplit(url).netloc}")
+
+    for attempt in range(MAX_ATTEMPTS):
+        retry_budget.record_request()
+        started = time.monotonic()
+        try:
+            response = session.get(url, params=params, timeout=endpoint_timeout(url))
+            if response.status_code in RETRYABLE_STATUS:
+                response.raise_for_status()
+        except (requests.Timeout, requests.ConnectionError, requests.HTTPError) as e:
+            breaker.record_failure()
+            if _can_retry(attempt, breaker):
+                time.sleep(backoff_delay(attempt))
+                continue
+            body = _stale(url, params)
+            if body is not None:
+                return json.loads(body)
+            raise e
+        latencies.record(latency_key(url), time.monotonic() - started)
+        breaker.record_success()
+        _record_download(url, response)
+        # Other 4xx errors are the request's fault: no retry, no stale data
+        response.raise_for_status()
+        if key:
+            write_cache(key, response.content)
+        return response.json()
+
+# — Async client (httpx.AsyncClient with a provider base_url) —
+async def _send(client, endpoint, params, timeout):
+    response = await client.get(endpoint, params=params, timeout=timeout)
+    if response.status_code in RETRYABLE_STATUS:
+        response.raise_for_status()
+    return response
+
+async def _hedged_get(client, endpoint, params, timeout, key, throttle=None):
+    # Send a duplicate once the first request runs past the p95; first success wins
+    tasks = {asyncio.create_task(_send(client, endpoint, params, timeout))}
+    done, _ = await asyncio.wait(tasks, timeout=latencies.p95(key))
+    if not done and retry_budget.try_spend():
+        retry_budget.record_request()
+        if throttle:
+            await throttle()
+        tasks.add(asyncio.create_task(_send(client, endpoint, params, timeout)))
+
+    error = None
+    try:
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def aget_json(client, endpoint, params=None, ttl=None, immutable=False, hedge=False, throttle=None):
+    # `throttle`, if given, is awaited before every request sent (first attempt,
+    # retries and hedges), e.g. a caller's per-provider rate limiter
+    url = str(client.base_url.join(endpoint))
+    key, body = _lookup(url, params, ttl, immutable)
+    if body is not None:
+        _record_hit(url)
+        return json.loads(body)
+
+    breaker = breakers[client.base_url.host]
+    if not breaker.allow():
+        body = _stale(url, params)
+        if body is not None:
+            return json.loads(body)
+        raise httpx.ConnectError(f"Circuit open for {client.base_url.host}")
+
+    connect, read = endpoint_timeout(url)
+    timeout = httpx.Timeout(read, connect=connect)
+    lkey = latency_key(url)
+    for attempt in range(MAX_ATTEMPTS):
+        retry_budget.record_request()
+        started = time.monotonic()
+        try:
+            if throttle:
+                await throttle()
+            if hedge:
+                response = await _hedged_get(client, endpoint, params, timeout, lkey, throttle)
+            else:
+                response = await _send(client, endpoint, params, timeout)
+        except (httpx.TimeoutException, httpx.TransportError, httpx.HTTPStatusError) as e:
+            breaker.record_failure()
+            if _can_retry(attempt, breaker):
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            body = _stale(url, params)
+            if body is not None:
+                return json.loads(body)
+            raise e
+        latencies.record(lkey, time.monotonic() - started)
+        breaker.record_success()
+        _record_download(url, response)
+        response.raise_for_status()
+        if key:
+            write_cache(key, response.content)
+        return response.json()
@@ -0,0 +1,79 @@
+import json
+import hashlib
+import threading
+from db import connect
+
+# Memoized LLM forecasts: identical prompt inputs (model, temperature, VT data,
+# signals, headlines) return the stored forecast without calling the API again.
+
+FORECAST_CACHE_DDL = """
+CREATE TABLE IF NOT EXISTS forecast_cache (
+    input_hash TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    forecast JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+# Expected forecast fields and how to coerce them
+FORECAST_FIELDS = {
+    "forecasted_pct": float,
+    "confidence_level": lambda value: int(float(value)),
+    "volatility_indicator": lambda value: str(value).strip().lower(),
+    "headline_summary": str,
+}
+
+_table_ready = False
+_table_lock = threading.Lock()
+
+def forecast_key(model, temperature, inputs):
+    raw = json.dumps(
+        {"model": model, "temperature": temperature, "inputs": inputs},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def parse_forecast(response_text):
+    data = json.loads(response_text)
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object, got {type(data).__name__}")
+
+    parsed = {}
+    for field, cast in FORECAST_FIELDS.items():
+        if data.get(field) is None:
+            raise ValueError(f"Missing field '{field}' in forecast")
+        parsed[field] = cast(data[field])
+    return parsed
+
+def ensure_table():
+    # Created and committed on a connection of its own, so the table outlives a
+    # caller's rolled back transaction and concurrent workers never see it half made
+    global _table_ready
+    with _table_lock:
+        if _table_ready:
+            return
+        connection = connect()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(FORECAST_CACHE_DDL)
+            connection.commit()
+        finally:
+            connection.close()
+        _table_ready = True
+
+def load_forecast(cursor, key):
+    ensure_table()
+    cursor.execute("SELECT forecast FROM forecast_cache WHERE input_hash = %s", (key,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def store_forecast(cursor, key, model, parsed):
+    ensure_table()
+    cursor.execute(
+        """
+        INSERT INTO forecast_cache (input_hash, model, forecast)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (input_hash) DO UPDATE SET forecast = EXCLUDED.forecast, created_at = now()
+        """,
+        (key, model, json.dumps(parsed))
+    )
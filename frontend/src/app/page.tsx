@@ -7,20 +7,56 @@ import { LineChartComponent, BarChartComponent } from "@/components/Chart";
 import DottedLine from "@/components/ui/dotted-line";
 import { DataTable } from "@/components/Table";
 
+const API_URL = "https://ai4vt-production.up.railway.app";
+
+// One /results row; days that are not evaluated yet (e.g. before the open) have null values
+type ResultRow = {
+  date: string;
+  close_yesterday: number | null;
+  open_today: number | null;
+  real_move_pct: number | null;
+  sentiment_score: number | null;
+  market_impact_score: number | null;
+  confidence_level: number | null;
+  volatility_indicator: string | null;
+  forecasted_pct: number | null;
+  calculated_pct: number | null;
+  average_pct: number | null;
+  correct: boolean | null;
+  summary?: string | null;
+};
+
+// Replace the row for the same date, or insert it keeping the list sorted by date
+function mergeRow(rows: ResultRow[], row: ResultRow) {
+  const others = rows.filter((r) => r.date !== row.date);
+  return [...others, row].sort((a, b) => a.date.localeCompare(b.date));
+}
+
 export default function Home() {
-  const [data, setData] = useState([]);
+  const [data, setData] = useState<ResultRow[]>([]);
 
   useEffect(() => {
-    async function fetchData() {
+    // `/results` may be served from the browser or CDN copy for a while (Cache-Control),
+    // so a reload after a change revalidates it; an unchanged body costs just a 304
+    async function fetchData(cache: RequestCache = "default") {
       try {
-        const res = await fetch("https://ai4vt-production.up.railway.app/results");
-        const json = await res.json();
+        const res = await fetch(`${API_URL}/results?include=summaries`, { cache });
+        const json: ResultRow[] = await res.json();
         setData(json);
       } catch (error) {
         console.error("Error fetching data:", error);
       }
     }
     fetchData();
+
+    // Live updates: a changed day arrives as a single row, larger changes ask for a reload
+    const events = new EventSource(`${API_URL}/events`);
+    events.addEventListener("result", (event) => {
+      const { row }: { row: ResultRow } = JSON.parse((event as MessageEvent).data);
+      setData((rows) => mergeRow(rows, row));
+    });
+    events.addEventListener("refresh", () => fetchData("no-cache"));
+    return () => events.close();
   }, []);
 
   if (!data || data.length === 0) {
@@ -36,10 +36,16 @@ import {
 
 type ChartDataPoint = {
   date: string;
-  real_move_pct: number;
-  average_pct: number;
+  real_move_pct: number | null;
+  average_pct: number | null;
 };
 
+// Both values are known, e.g. not a day still waiting for the open
+type EvaluatedDataPoint = ChartDataPoint & { real_move_pct: number; average_pct: number };
+
+const isEvaluated = (item: ChartDataPoint): item is EvaluatedDataPoint =>
+  item.real_move_pct != null && item.average_pct != null;
+
 export function LineChartComponent({ data }: { data: ChartDataPoint[] }) {
   const [timeRange, setTimeRange] = React.useState("90d");
 
@@ -169,7 +175,7 @@ export function BarChartComponent({ data }: { data: ChartDataPoint[] }) {
     const startDate = new Date(referenceDate);
     startDate.setDate(startDate.getDate() - daysToSubtract);
     return date >= startDate;
-  }).map((item) => {
+  }).filter(isEvaluated).map((item) => {
     const rawDiff = item.real_move_pct - item.average_pct;
     const absDiff = Math.abs(rawDiff);
 
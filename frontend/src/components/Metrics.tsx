@@ -15,36 +15,40 @@ import {
 
 type MetricDataPoint = {
   date: string;
-  average_pct: number;
-  confidence_level: number;
-  open_today: number;
-  real_move_pct: number;
-  sentiment_score: number;
-  correct: boolean;
+  average_pct: number | null;
+  confidence_level: number | null;
+  open_today: number | null;
+  real_move_pct: number | null;
+  sentiment_score: number | null;
+  correct: boolean | null;
+  summary?: string | null;
 };
 
+// Days that are not evaluated yet (e.g. before the open) have null values
+const formatValue = (value: number | null, suffix = "") => (value == null ? "—" : `${value}${suffix}`)
+
+// Change from the previous day, left out when either day has no value yet
+function ChangeBadge({ current, previous, suffix = "" }: { current: number | null; previous: number | null; suffix?: string }) {
+  if (current == null || previous == null) {
+    return null
+  }
+  const change = current - previous
+  return (
+    <div className="flex gap-1 mt-2">
+      <Badge variant="outline" className="flex items-center gap-1">
+        {change >= 0 ? <TrendingUpIcon className="h-3 w-3" /> : <TrendingDownIcon className="h-3 w-3" />}
+        {change >= 0 ? "+" : ""}
+        {change.toFixed(2)}{suffix}
+      </Badge>
+    </div>
+  )
+}
+
 export default function Metrics({ data }: { data: MetricDataPoint[] }) {
-  const [summary, setSummary] = useState("")
+  const summary = data[data.length - 1]?.summary ?? ""
   const [marketOpen, setMarketOpen] = useState(false)
 
   useEffect(() => {
-    async function fetchSummary() {
-      try {
-        const mostRecentDate = data[data.length - 1]?.date
-        if (mostRecentDate) {
-          const res = await fetch(`https://ai4vt-production.up.railway.app/summary/${mostRecentDate}`)
-          const json = await res.json()
-          setSummary(json.summary)
-        }
-      } catch (error) {
-        console.error("Error fetching summary:", error)
-      }
-    }
-
-    if (data.length > 0) {
-      fetchSummary()
-    }
-
     function checkMarketOpen() {
       const now = new Date()
       const nyTime = new Date(now.toLocaleString("en-US", { timeZone: "America/New_York" }))
@@ -77,8 +81,6 @@ export default function Metrics({ data }: { data: MetricDataPoint[] }) {
     ? Math.round((data.filter((d, idx) => idx !== data.length - 1 && d.correct).length / (data.length - 1)) * 100)
     : 0
 
-  const metricDifference = (todayValue: number, yesterdayValue: number) => todayValue - yesterdayValue
-
   return (
     <section className="flex flex-col gap-6 max-w-6xl mx-auto py-8 px-2">
       <div className="flex items-center gap-2">
@@ -96,15 +98,7 @@ export default function Metrics({ data }: { data: MetricDataPoint[] }) {
             <CardTitle className="@[250px]/card:text-3xl text-2xl font-semibold tabular-nums">
               {winRate}%
             </CardTitle>
-            {yesterday && (
-              <div className="flex gap-1 mt-2">
-                <Badge variant="outline" className="flex items-center gap-1">
-                  {metricDifference(winRate, yesterdayWinRate) >= 0 ? <TrendingUpIcon className="h-3 w-3" /> : <TrendingDownIcon className="h-3 w-3" />}
-                  {metricDifference(winRate, yesterdayWinRate) >= 0 ? "+" : ""}
-                  {metricDifference(winRate, yesterdayWinRate).toFixed(2)}%
-                </Badge>
-              </div>
-            )}
+            {yesterday && <ChangeBadge current={winRate} previous={yesterdayWinRate} suffix="%" />}
           </CardHeader>
           <CardFooter className="flex flex-col items-start text-sm">
             <div className="font-medium">
@@ -118,17 +112,9 @@ export default function Metrics({ data }: { data: MetricDataPoint[] }) {
           <CardHeader>
             <CardDescription>Today Average Forecast</CardDescription>
             <CardTitle className="@[250px]/card:text-3xl text-2xl font-semibold tabular-nums">
-              {today.average_pct}%
+              {formatValue(today.average_pct, "%")}
             </CardTitle>
-            {yesterday && (
-              <div className="flex gap-1 mt-2">
-                <Badge variant="outline" className="flex items-center gap-1">
-                  {metricDifference(today.average_pct, yesterday.average_pct) >= 0 ? <TrendingUpIcon className="h-3 w-3" /> : <TrendingDownIcon className="h-3 w-3" />}
-                  {metricDifference(today.average_pct, yesterday.average_pct) >= 0 ? "+" : ""}
-                  {metricDifference(today.average_pct, yesterday.average_pct).toFixed(2)}%
-                </Badge>
-              </div>
-            )}
+            {yesterday && <ChangeBadge current={today.average_pct} previous={yesterday.average_pct} suffix="%" />}
           </CardHeader>
           <CardFooter className="flex flex-col items-start text-sm">
             <div className="font-medium">
@@ -142,17 +128,9 @@ export default function Metrics({ data }: { data: MetricDataPoint[] }) {
           <CardHeader>
             <CardDescription>Prediction Confidence</CardDescription>
             <CardTitle className="@[250px]/card:text-3xl text-2xl font-semibold tabular-nums">
-              {today.confidence_level}%
+              {formatValue(today.confidence_level, "%")}
             </CardTitle>
-            {yesterday && (
-              <div className="flex gap-1 mt-2">
-                <Badge variant="outline" className="flex items-center gap-1">
-                  {metricDifference(today.confidence_level, yesterday.confidence_level) >= 0 ? <TrendingUpIcon className="h-3 w-3" /> : <TrendingDownIcon className="h-3 w-3" />}
-                  {metricDifference(today.confidence_level, yesterday.confidence_level) >= 0 ? "+" : ""}
-                  {metricDifference(today.confidence_level, yesterday.confidence_level).toFixed(2)}%
-                </Badge>
-              </div>
-            )}
+            {yesterday && <ChangeBadge current={today.confidence_level} previous={yesterday.confidence_level} suffix="%" />}
           </CardHeader>
           <CardFooter className="flex flex-col items-start text-sm">
             <div className="font-medium">
@@ -166,17 +144,9 @@ export default function Metrics({ data }: { data: MetricDataPoint[] }) {
           <CardHeader>
             <CardDescription>Today Open Price</CardDescription>
             <CardTitle className="@[250px]/card:text-3xl text-2xl font-semibold tabular-nums">
-              ${today.open_today.toFixed(2)}
+              {today.open_today == null ? "—" : `$${today.open_today.toFixed(2)}`}
             </CardTitle>
-            {yesterday && (
-              <div className="flex gap-1 mt-2">
-                <Badge variant="outline" className="flex items-center gap-1">
-                  {metricDifference(today.open_today, yesterday.open_today) >= 0 ? <TrendingUpIcon className="h-3 w-3" /> : <TrendingDownIcon className="h-3 w-3" />}
-                  {metricDifference(today.open_today, yesterday.open_today) >= 0 ? "+" : ""}
-                  {metricDifference(today.open_today, yesterday.open_today).toFixed(2)}%
-                </Badge>
-              </div>
-            )}
+            {yesterday && <ChangeBadge current={today.open_today} previous={yesterday.open_today} suffix="%" />}
           </CardHeader>
           <CardFooter className="flex flex-col items-start text-sm">
             <div className="font-medium">
@@ -190,17 +160,9 @@ export default function Metrics({ data }: { data: MetricDataPoint[] }) {
           <CardHeader>
             <CardDescription>Real Market Move</CardDescription>
             <CardTitle className="@[250px]/card:text-3xl text-2xl font-semibold tabular-nums">
-              {today.real_move_pct}%
+              {formatValue(today.real_move_pct, "%")}
             </CardTitle>
-            {yesterday && (
-              <div className="flex gap-1 mt-2">
-                <Badge variant="outline" className="flex items-center gap-1">
-                  {metricDifference(today.real_move_pct, yesterday.real_move_pct) >= 0 ? <TrendingUpIcon className="h-3 w-3" /> : <TrendingDownIcon className="h-3 w-3" />}
-                  {metricDifference(today.real_move_pct, yesterday.real_move_pct) >= 0 ? "+" : ""}
-                  {metricDifference(today.real_move_pct, yesterday.real_move_pct).toFixed(2)}%
-                </Badge>
-              </div>
-            )}
+            {yesterday && <ChangeBadge current={today.real_move_pct} previous={yesterday.real_move_pct} suffix="%" />}
           </CardHeader>
           <CardFooter className="flex flex-col items-start text-sm">
             <div className="font-medium">
@@ -214,17 +176,9 @@ export default function Metrics({ data }: { data: MetricDataPoint[] }) {
           <CardHeader>
             <CardDescription>Sentiment Score</CardDescription>
             <CardTitle className="@[250px]/card:text-3xl text-2xl font-semibold tabular-nums">
-              {today.sentiment_score}
+              {formatValue(today.sentiment_score)}
             </CardTitle>
-            {yesterday && (
-              <div className="flex gap-1 mt-2">
-                <Badge variant="outline" className="flex items-center gap-1">
-                  {metricDifference(today.sentiment_score, yesterday.sentiment_score) >= 0 ? <TrendingUpIcon className="h-3 w-3" /> : <TrendingDownIcon className="h-3 w-3" />}
-                  {metricDifference(today.sentiment_score, yesterday.sentiment_score) >= 0 ? "+" : ""}
-                  {metricDifference(today.sentiment_score, yesterday.sentiment_score).toFixed(2)}
-                </Badge>
-              </div>
-            )}
+            {yesterday && <ChangeBadge current={today.sentiment_score} previous={yesterday.sentiment_score} />}
           </CardHeader>
           <CardFooter className="flex flex-col items-start text-sm">
             <div className="font-medium">
@@ -26,37 +26,25 @@ import { Pagination, PaginationContent, PaginationItem, PaginationNext, Paginati
 
 type TableDataPoint = {
   date: string;
-  open_today: number;
-  close_yesterday: number;
-  real_move_pct: number;
-  average_pct: number;
-  sentiment_score: number;
-  confidence_level: number;
-  correct: boolean;
+  open_today: number | null;
+  close_yesterday: number | null;
+  real_move_pct: number | null;
+  average_pct: number | null;
+  sentiment_score: number | null;
+  confidence_level: number | null;
+  correct: boolean | null;
+  summary?: string | null;
 };
 
+// Days that are not evaluated yet (e.g. before the open) have null values
+const formatNumber = (value: number | null, suffix = "") => (value == null ? "—" : `${value.toFixed(2)}${suffix}`)
+
 export function DataTable({ data }: { data: TableDataPoint[] }) {
-  const [summary, setSummary] = React.useState<string>("")
-  const [loading, setLoading] = React.useState(false)
   const [currentPage, setCurrentPage] = React.useState(1)
   const itemsPerPage = 10
 
   const sortedData = [...data].sort((a, b) => new Date(b.date).getTime() - new Date(a.date).getTime())
 
-  const fetchSummary = async (date: string) => {
-    setLoading(true)
-    try {
-      const res = await fetch(`https://ai4vt-production.up.railway.app/summary/${date}`)
-      const json = await res.json()
-      setSummary(json.summary || "No summary found.")
-    } catch (error) {
-      console.error(error)
-      setSummary("Error loading summary.")
-    } finally {
-      setLoading(false)
-    }
-  }
-
   const paginatedData = sortedData.slice((currentPage - 1) * itemsPerPage, currentPage * itemsPerPage)
   const totalPages = Math.ceil(sortedData.length / itemsPerPage)
 
@@ -81,14 +69,16 @@ export function DataTable({ data }: { data: TableDataPoint[] }) {
             {paginatedData.map((item) => (
               <TableRow key={item.date}>
                 <TableCell>{item.date}</TableCell>
-                <TableCell className="text-right">{item.open_today.toFixed(2)}</TableCell>
-                <TableCell className="text-right">{item.close_yesterday.toFixed(2)}</TableCell>
-                <TableCell className="text-right">{item.real_move_pct.toFixed(2)}%</TableCell>
-                <TableCell className="text-right">{item.average_pct.toFixed(2)}%</TableCell>
-                <TableCell className="text-right">{item.sentiment_score}%</TableCell>
-                <TableCell className="text-right">{item.confidence_level}%</TableCell>
+                <TableCell className="text-right">{formatNumber(item.open_today)}</TableCell>
+                <TableCell className="text-right">{formatNumber(item.close_yesterday)}</TableCell>
+                <TableCell className="text-right">{formatNumber(item.real_move_pct, "%")}</TableCell>
+                <TableCell className="text-right">{formatNumber(item.average_pct, "%")}</TableCell>
+                <TableCell className="text-right">{item.sentiment_score == null ? "—" : `${item.sentiment_score}%`}</TableCell>
+                <TableCell className="text-right">{item.confidence_level == null ? "—" : `${item.confidence_level}%`}</TableCell>
                 <TableCell className="text-right">
-                  {item.correct ? (
+                  {item.correct == null ? (
+                    <Badge variant="outline">Pending</Badge>
+                  ) : item.correct ? (
                     <Badge variant="outline" className="text-green-500 border-green-500">Correct</Badge>
                   ) : (
                     <Badge variant="outline" className="text-red-500 border-red-500">Wrong</Badge>
@@ -97,11 +87,7 @@ export function DataTable({ data }: { data: TableDataPoint[] }) {
                 <TableCell className="text-right">
                   <Drawer>
                     <DrawerTrigger asChild>
-                      <Button
-                        variant="outline"
-                        size="sm"
-                        onClick={() => fetchSummary(item.date)}
-                      >
+                      <Button variant="outline" size="sm">
                         View
                       </Button>
                     </DrawerTrigger>
@@ -112,7 +98,7 @@ export function DataTable({ data }: { data: TableDataPoint[] }) {
                           <DrawerDescription>News and sentiment info for this date.</DrawerDescription>
                         </DrawerHeader>
                         <div className="p-4 text-sm">
-                          {loading ? "Loading..." : summary}
+                          {item.summary || "No summary found."}
                         </div>
                         <DrawerFooter>
                           <DrawerClose asChild>
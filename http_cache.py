@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# HTTP-level caching for the API's serialized payloads: strong ETags, 304s on
+# If-None-Match, Cache-Control, and gzip/brotli variants compressed once per
+# cached payload instead of once per response.
+
+# Data changes a few times a day; clients and the CDN may serve a copy for a
+# minute and keep serving it while they revalidate in the background
+DEFAULT_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=600"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Smaller bodies aren't worth the CPU or the Content-Encoding header
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+class CachedBody:
+    def __init__(self, content: bytes):
+        self.content = content
+        # The ETag comes from the bytes themselves, so it stays valid across
+        # restarts and replicas (the NOTIFY version counter does not)
+        self.etag = hashlib.sha256(content).hexdigest()[:32]
+        self.variants = {}
+
+    def encoded(self, encoding):
+        if encoding is None:
+            return self.content
+        if encoding not in self.variants:
+            if encoding == "br":
+                self.variants[encoding] = brotli.compress(self.content, quality=BROTLI_QUALITY)
+            else:
+                self.variants[encoding] = gzip.compress(self.content, compresslevel=GZIP_LEVEL, mtime=0)
+        return self.variants[encoding]
+
+def choose_encoding(accept_encoding, size):
+    if size < MIN_COMPRESS_BYTES or not accept_encoding:
+        return None
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None:
+            continue
+        if offered.get(encoding, offered.get("*", 0)) > 0:
+            return encoding
+    return None
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+def cached_response(body: CachedBody, request_headers, media_type="application/json",
+                    cache_control=DEFAULT_CACHE_CONTROL, headers=None, vary=()):
+    # `vary` lists any other request headers the body was negotiated on
+    encoding = choose_encoding(request_headers.get("accept-encoding"), len(body.content))
+    # Each representation gets its own strong validator
+    etag = f'"{body.etag}-{encoding}"' if encoding else f'"{body.etag}"'
+    headers = {
+        **(headers or {}),
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Vary": ", ".join((*vary, "Accept-Encoding")),
+    }
+    if etag_matches(request_headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body.encoded(encoding), media_type=media_type, headers=headers)
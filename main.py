@@ -1,11 +1,25 @@
 import os
+import asyncio
+import time
+import base64
+import orjson
 import databases
 import sqlalchemy
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from datetime import datetime, date
+from typing import Literal
+from data_events import Broadcaster, DataVersionListener
+from db import daily_data, results, summaries, metrics_aggregates
+from metrics import OVERALL_BUCKET, VOLATILITY_BUCKET_PREFIX, ensure_metrics_table, summarize_bucket
+from response_cache import PayloadCache
+from results_table import RESULT_COLUMNS, RESULTS_TABLE_DDL, rebuild_results_sql
+from scheduler import SCHEDULER_ENABLED, JobScheduler
+from http_cache import IMMUTABLE_CACHE_CONTROL, CachedBody, cached_response
+from telemetry import QUERY_METRIC, SERIALIZE_METRIC, RequestTimingMiddleware, render_prometheus, span
 
 # — Load environment variables —
 load_dotenv()
@@ -15,36 +29,6 @@ if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL not set")
 
 database = databases.Database(DATABASE_URL)
-metadata = sqlalchemy.MetaData()
-
-# — Define your tables —
-daily_data = sqlalchemy.Table(
-    "daily_data", metadata,
-    sqlalchemy.Column("date", sqlalchemy.Date, primary_key=True),
-    sqlalchemy.Column("close_yesterday", sqlalchemy.Numeric),
-    sqlalchemy.Column("open_today", sqlalchemy.Numeric),
-    sqlalchemy.Column("real_move_pct", sqlalchemy.Numeric),
-)
-
-predictions = sqlalchemy.Table(
-    "predictions", metadata,
-    sqlalchemy.Column("date", sqlalchemy.Date, sqlalchemy.ForeignKey("daily_data.date"), primary_key=True),
-    sqlalchemy.Column("sentiment_score", sqlalchemy.Integer),
-    sqlalchemy.Column("market_impact_score", sqlalchemy.Integer),
-    sqlalchemy.Column("confidence_level", sqlalchemy.Integer),
-    sqlalchemy.Column("volatility_indicator", sqlalchemy.String),
-    sqlalchemy.Column("forecasted_pct", sqlalchemy.Numeric),
-    sqlalchemy.Column("calculated_pct", sqlalchemy.Numeric),
-    sqlalchemy.Column("average_pct", sqlalchemy.Numeric),
-    sqlalchemy.Column("correct", sqlalchemy.Boolean),
-)
-
-summaries = sqlalchemy.Table(
-    "headlines", metadata,
-    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
-    sqlalchemy.Column("date", sqlalchemy.Date),
-    sqlalchemy.Column("headline", sqlalchemy.Text),
-)
 
 # — Create FastAPI app —
 app = FastAPI(title="VT-ETF Prediction API")
@@ -55,67 +39,306 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(RequestTimingMiddleware)
 
 # — Pydantic models —
+# Values are None until the day is complete (e.g. today's row before the open)
 class Result(BaseModel):
     date: str
-    close_yesterday: float
-    open_today: float
-    real_move_pct: float
-    sentiment_score: int
-    market_impact_score: int
-    confidence_level: int
-    volatility_indicator: str
-    forecasted_pct: float
-    calculated_pct: float
-    average_pct: float
-    correct: bool
+    close_yesterday: float | None
+    open_today: float | None
+    real_move_pct: float | None
+    sentiment_score: int | None
+    market_impact_score: int | None
+    confidence_level: int | None
+    volatility_indicator: str | None
+    forecasted_pct: float | None
+    calculated_pct: float | None
+    average_pct: float | None
+    correct: bool | None
 
 class Summary(BaseModel):
     date: str
     summary: str
 
+class ResultWithSummary(Result):
+    summary: str | None = None
+
+class MetricsBucket(BaseModel):
+    days: int
+    hit_rate: float | None
+    mean_abs_error: float | None
+    hit_rate_20d: float | None
+    hit_rate_60d: float | None
+    last_date: str | None
+
+class Metrics(BaseModel):
+    overall: MetricsBucket | None
+    by_volatility: dict[str, MetricsBucket]
+
+# — Data version and response cache —
+# Writers NOTIFY on every commit; without a live listener we fall back to
+# max(date) plus a short TTL so in-place updates are still picked up.
+RESULTS_POLL_TTL = int(os.getenv("RESULTS_POLL_TTL", "60"))
+
+data_listener = DataVersionListener(DATABASE_URL)
+results_cache = PayloadCache()
+
+async def get_data_version():
+    if data_listener.is_listening:
+        return ("notify", data_listener.version)
+    query = sqlalchemy.select(sqlalchemy.func.max(daily_data.c.date))
+    latest = await database.fetch_val(query)
+    return ("poll", latest, int(time.time() // RESULTS_POLL_TTL))
+
+# — Index checks —
+# Range scans rely on a btree index led by `date` on each table read by date
+DATE_INDEXED_TABLES = ("results", "headlines")
+
+async def check_date_indexes():
+    query = sqlalchemy.text("""
+        SELECT t.relname AS table_name
+        FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = i.indkey[0]
+        WHERE t.relname = ANY(:tables) AND a.attname = 'date'
+    """).bindparams(tables=list(DATE_INDEXED_TABLES))
+    rows = await database.fetch_all(query)
+    indexed = {row["table_name"] for row in rows}
+    for table in DATE_INDEXED_TABLES:
+        if table not in indexed:
+            print(f"⚠️ No index led by '{table}.date'; range queries will scan the table. "
+                  f"Run: CREATE INDEX ON {table} (date);")
+
+async def ensure_results_table():
+    # First start after the read model was introduced: materialize the history once
+    if await database.fetch_val("SELECT to_regclass('results') IS NULL"):
+        print("[LOG] Creating the results table from daily_data and predictions")
+        async with database.transaction():
+            await database.execute(RESULTS_TABLE_DDL)
+            await database.execute(rebuild_results_sql())
+
+# — Live updates —
+# One relay task turns each NOTIFY into a small delta (built once) and fans it
+# out to every /events client; clients never trigger queries of their own.
+SSE_HEARTBEAT_SECONDS = 15
+DELTA_TABLES = ("daily_data", "predictions", "headlines")
+
+# A client that falls behind reloads /results, one of the events it already handles
+sse_clients = Broadcaster(overflow_event={"type": "refresh"})
+relay_task = None
+
+# The jobs run in this process only when SCHEDULER_ENABLED is set (one service per deployment)
+job_scheduler = JobScheduler() if SCHEDULER_ENABLED else None
+
+async def build_delta(change):
+    version = change.get("version")
+    table = change.get("table")
+    if table == "metrics_aggregates":
+        return {"type": "metrics", "version": version}
+    if change.get("type") == "resync" or table not in DELTA_TABLES or change.get("days", 1) != 1:
+        # Batches (backfills, rebuilds) are cheaper to reload than to describe
+        return {"type": "refresh", "version": version}
+
+    day = date.fromisoformat(change["date"])
+    query = results_query(date_from=day, date_to=day, with_summaries=True)
+    with span("delta", metric=QUERY_METRIC):
+        row = await database.fetch_one(query)
+    if row is None:
+        # e.g. an open price for a day without a forecast yet
+        return None
+    return {"type": "result", "version": version, "row": dict(row._mapping)}
+
+async def relay_changes():
+    queue = data_listener.changes.subscribe()
+    try:
+        while True:
+            change = await queue.get()
+            if not len(sse_clients):
+                continue
+            try:
+                delta = await build_delta(change)
+            except Exception as e:
+                print(f"❌ Error building live update: {e}")
+                delta = {"type": "refresh", "version": change.get("version")}
+            if delta:
+                sse_clients.publish(delta)
+    finally:
+        data_listener.changes.unsubscribe(queue)
+
+def format_sse(event):
+    lines = [f"event: {event['type']}"]
+    if event.get("version") is not None:
+        lines.append(f"id: {event['version']}")
+    lines.append(f"data: {orjson.dumps(event).decode()}")
+    return ("\n".join(lines) + "\n\n").encode()
+
 # — Startup and Shutdown events —
 @app.on_event("startup")
 async def startup():
+    global relay_task
     await database.connect()
+    await ensure_results_table()
+    await asyncio.to_thread(ensure_metrics_table)
+    await data_listener.start()
+    relay_task = asyncio.create_task(relay_changes())
+    await check_date_indexes()
+    if job_scheduler:
+        job_scheduler.start()
 
 @app.on_event("shutdown")
 async def shutdown():
+    if job_scheduler:
+        await job_scheduler.stop()
+    if relay_task:
+        relay_task.cancel()
+    await data_listener.stop()
     await database.disconnect()
 
 # — GET /results —
+MAX_RESULTS_LIMIT = 5000
+
+# Result fields in response order; `summary` only with include=summaries
+RESULT_FIELDS = [name for name in RESULT_COLUMNS if name != "summary"]
+COLUMNAR_MEDIA_TYPE = "application/vnd.ai4vt.columnar+json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def encode_cursor(last_date):
+    return base64.urlsafe_b64encode(str(last_date).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return date.fromisoformat(base64.urlsafe_b64decode(padded).decode())
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def results_query(date_from=None, date_to=None, after=None, limit=None, with_summaries=False):
+    # A primary-key range scan of the results read model; its columns are already typed for JSON
+    names = RESULT_FIELDS + ["summary"] if with_summaries else RESULT_FIELDS
+    query = sqlalchemy.select(*(results.c[name] for name in names)).order_by(results.c.date)
+    if date_from:
+        query = query.where(results.c.date >= date_from)
+    if date_to:
+        query = query.where(results.c.date <= date_to)
+    if after:
+        query = query.where(results.c.date > after)
+    if limit:
+        query = query.limit(limit)
+    return query
+
+async def fetch_results_page(date_from=None, date_to=None, after=None, limit=None, with_summaries=False):
+    # Fetch one extra row to know whether another page exists
+    query = results_query(date_from, date_to, after, limit and limit + 1, with_summaries)
+    with span("results", metric=QUERY_METRIC):
+        rows = await database.fetch_all(query)
+
+    next_cursor = None
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["date"])
+    return rows, next_cursor
+
+async def build_columnar_payload(date_from=None, date_to=None, after=None, limit=None,
+                                 with_summaries=False):
+    rows, next_cursor = await fetch_results_page(date_from, date_to, after, limit, with_summaries)
+    names = RESULT_FIELDS + ["summary"] if with_summaries else RESULT_FIELDS
+    with span("columnar", metric=SERIALIZE_METRIC):
+        columns = {name: [row[name] for row in rows] for name in names}
+        payload = orjson.dumps(columns)
+    return payload, next_cursor
+
+async def build_results_payload(date_from=None, date_to=None, after=None, limit=None,
+                                with_summaries=False):
+    rows, next_cursor = await fetch_results_page(date_from, date_to, after, limit, with_summaries)
+    # orjson writes dates as YYYY-MM-DD, so rows go out as stored
+    with span("results", metric=SERIALIZE_METRIC):
+        payload = orjson.dumps([dict(row._mapping) for row in rows])
+    return payload, next_cursor
+
+async def stream_results_ndjson(date_from=None, date_to=None, after=None, limit=None,
+                                with_summaries=False):
+    # One JSON object per line, written as rows come off a server-side cursor:
+    # memory stays flat and the first row goes out before the query finishes
+    query = results_query(date_from, date_to, after, limit, with_summaries)
+    async for row in database.iterate(query):
+        yield orjson.dumps(dict(row._mapping)) + b"\n"
+
 @app.get("/results", response_model=list[Result])
-async def get_results():
+async def get_results(
+    request: Request,
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    limit: int | None = Query(None, ge=1, le=MAX_RESULTS_LIMIT),
+    cursor: str | None = None,
+    format: Literal["rows", "columnar", "ndjson"] = "rows",
+    include: Literal["summaries"] | None = None,
+    accept: str | None = Header(None),
+):
     if not database.is_connected:
         await database.connect()
 
-    query = (
-        daily_data
-        .join(predictions, daily_data.c.date == predictions.c.date)
-        .select()
-        .order_by(daily_data.c.date)
-    )
-    rows = await database.fetch_all(query)
+    after = decode_cursor(cursor) if cursor else None
+    with_summaries = include == "summaries"
+
+    # Streaming exports bypass the payload cache; there is no X-Next-Cursor since
+    # headers go out before the last row is known
+    if format == "ndjson" or NDJSON_MEDIA_TYPE in (accept or ""):
+        return StreamingResponse(
+            stream_results_ndjson(date_from, date_to, after, limit, with_summaries),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+
+    columnar = format == "columnar" or COLUMNAR_MEDIA_TYPE in (accept or "")
+    builder = build_columnar_payload if columnar else build_results_payload
+
+    async def build():
+        payload, next_cursor = await builder(date_from, date_to, after, limit, with_summaries)
+        return CachedBody(payload), next_cursor
+
+    version = await get_data_version()
+    key = ("columnar" if columnar else "results", date_from, date_to, after, limit, with_summaries)
+    body, next_cursor = await results_cache.get_or_build(version, key, build)
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    media_type = COLUMNAR_MEDIA_TYPE if columnar else "application/json"
+    # Rows and columnar share a URL when chosen by Accept, so shared caches must key on it
+    return cached_response(body, request.headers, media_type, headers=headers, vary=("Accept",))
 
-    fixed_rows = []
-    for r in rows:
-        r_dict = dict(r)
-        r_dict["date"] = r_dict["date"].strftime("%Y-%m-%d")
-        r_dict["close_yesterday"] = float(r_dict["close_yesterday"])
-        r_dict["open_today"] = float(r_dict["open_today"])
-        r_dict["real_move_pct"] = float(r_dict["real_move_pct"])
-        r_dict["forecasted_pct"] = float(r_dict["forecasted_pct"])
-        r_dict["calculated_pct"] = float(r_dict["calculated_pct"])
-        r_dict["average_pct"] = float(r_dict["average_pct"])
-        fixed_rows.append(Result(**r_dict))
+# — GET /events —
+@app.get("/events")
+async def get_events(request: Request):
+    # Server-sent events: "result" carries one changed row, "metrics" and
+    # "refresh" tell the client to re-fetch /metrics or /results
+    if not data_listener.is_listening:
+        raise HTTPException(status_code=503, detail="Live updates unavailable, poll /results instead")
 
-    return fixed_rows
+    queue = sse_clients.subscribe()
+
+    async def stream():
+        try:
+            yield b"retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            sse_clients.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # — GET /summary/{date} —
 @app.get("/summary/{date}", response_model=Summary)
-async def get_summary(date: str):
+async def get_summary(date: str, request: Request):
     if not database.is_connected:
         await database.connect()
 
@@ -125,9 +348,97 @@ async def get_summary(date: str):
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
 
     query = summaries.select().where(summaries.c.date == date_obj)
-    row = await database.fetch_one(query)
+    with span("summary", metric=QUERY_METRIC):
+        row = await database.fetch_one(query)
 
     if not row:
         raise HTTPException(status_code=404, detail="No summary found for this date")
 
-    return Summary(date=row["date"].strftime("%Y-%m-%d"), summary=row["headline"])
\ No newline at end of file
+    body = CachedBody(orjson.dumps({"date": row["date"].strftime("%Y-%m-%d"), "summary": row["headline"]}))
+    # A past day's summary is written once and never changes
+    if date_obj < datetime.utcnow().date():
+        return cached_response(body, request.headers, cache_control=IMMUTABLE_CACHE_CONTROL)
+    return cached_response(body, request.headers)
+
+# — GET /summaries —
+MAX_SUMMARY_DATES = 500
+
+def parse_date_list(dates):
+    try:
+        parsed = {datetime.strptime(d.strip(), "%Y-%m-%d").date() for d in dates.split(",") if d.strip()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD.")
+    if len(parsed) > MAX_SUMMARY_DATES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SUMMARY_DATES} dates per request")
+    return sorted(parsed)
+
+async def build_summaries_payload(date_from=None, date_to=None, date_list=None):
+    query = sqlalchemy.select(summaries.c.date, summaries.c.headline).order_by(summaries.c.date)
+    if date_list is not None:
+        query = query.where(summaries.c.date.in_(date_list))
+    if date_from:
+        query = query.where(summaries.c.date >= date_from)
+    if date_to:
+        query = query.where(summaries.c.date <= date_to)
+    with span("summaries", metric=QUERY_METRIC):
+        rows = await database.fetch_all(query)
+
+    with span("summaries", metric=SERIALIZE_METRIC):
+        return orjson.dumps([
+            {"date": row["date"].strftime("%Y-%m-%d"), "summary": row["headline"]}
+            for row in rows
+        ])
+
+@app.get("/summaries", response_model=list[Summary])
+async def get_summaries(
+    request: Request,
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    dates: str | None = None,
+):
+    if not database.is_connected:
+        await database.connect()
+
+    date_list = tuple(parse_date_list(dates)) if dates else None
+
+    async def build():
+        return CachedBody(await build_summaries_payload(date_from, date_to, date_list))
+
+    version = await get_data_version()
+    key = ("summaries", date_from, date_to, date_list)
+    body = await results_cache.get_or_build(version, key, build)
+    return cached_response(body, request.headers)
+
+# — GET /metrics —
+async def build_metrics_payload():
+    with span("metrics", metric=QUERY_METRIC):
+        rows = await database.fetch_all(metrics_aggregates.select())
+
+    with span("metrics", metric=SERIALIZE_METRIC):
+        overall = None
+        by_volatility = {}
+        for row in rows:
+            if row["bucket"] == OVERALL_BUCKET:
+                overall = summarize_bucket(row)
+            elif row["bucket"].startswith(VOLATILITY_BUCKET_PREFIX):
+                by_volatility[row["bucket"][len(VOLATILITY_BUCKET_PREFIX):]] = summarize_bucket(row)
+
+        return orjson.dumps({"overall": overall, "by_volatility": by_volatility})
+
+@app.get("/metrics", response_model=Metrics)
+async def get_metrics(request: Request):
+    if not database.is_connected:
+        await database.connect()
+
+    async def build():
+        return CachedBody(await build_metrics_payload())
+
+    version = await get_data_version()
+    body = await results_cache.get_or_build(version, "metrics", build)
+    return cached_response(body, request.headers)
+
+# — GET /telemetry —
+# Prometheus text format; /metrics is taken by the forecast accuracy metrics
+@app.get("/telemetry", response_class=PlainTextResponse)
+async def get_telemetry():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -1,8 +1,12 @@
 import os
-import psycopg2
-import requests
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from db import connect, write_days
+from price_store import intraday_store, update_intraday
+from evaluate import evaluate
+from metrics import fold_scored_days
+from telemetry import annotate_run, run_record, span
+from trading_calendar import is_trading_day
 
 # Load environment variables
 load_dotenv()
@@ -13,71 +17,55 @@ FMP_API_KEY = os.getenv("FMP_API_KEY")
 if not DATABASE_URL or not FMP_API_KEY:
     raise RuntimeError("Missing DATABASE_URL or FMP_API_KEY")
 
-def is_market_open(target_date):
-    print(f"[LOG] Checking if the market is open on {target_date}")
-    url = f"https://financialmodelingprep.com/api/v3/is-the-market-open"
-    params = {"exchange": "NYSE", "apikey": FMP_API_KEY}
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        return data.get("isTheStockMarketOpen", False)
-    print(f"⚠️ Failed to fetch market status. Status code: {response.status_code}")
-    return False
+def fetch_open_price(market_day):
+    # Only bars newer than the last stored one are downloaded
+    store = intraday_store()
+    with span("fetch_intraday") as attributes:
+        added = update_intraday(store, FMP_API_KEY, day=market_day)
+        attributes["bars"] = added
+    print(f"[LOG] Stored {added} new intraday bars")
+    return store.open_on(market_day)
 
-def fetch_open_price(market_day_str):
-    url = "https://financialmodelingprep.com/api/v3/historical-chart/1min/VT"
-    params = {"apikey": FMP_API_KEY}
-    response = requests.get(url, params=params)
-    data = response.json()
-    if isinstance(data, list):
-        for entry in reversed(data):
-            if entry["date"].startswith(market_day_str):
-                return float(entry["open"])
-    return None
-
-def run_market_open_update():
-    now = datetime.utcnow()
+@run_record("market_open_update")
+def run_market_open_update(now=None):
+    now = now or datetime.utcnow()
     market_day = now.date()
-    market_day_str = market_day.strftime("%Y-%m-%d")
+    annotate_run(day=market_day)
 
     # Stop execution if the market is closed
-    if not is_market_open(market_day):
+    if not is_trading_day(market_day):
         print(f"[LOG] Market is closed on {market_day}. Stopping execution.")
+        annotate_run(status="skipped")
         return
 
-    connection = psycopg2.connect(DATABASE_URL)
+    connection = connect()
     cursor = connection.cursor()
 
-    open_price = fetch_open_price(market_day_str)
+    open_price = fetch_open_price(market_day)
     if open_price is None:
         print("⚠️ Could not fetch open price.")
+        annotate_run(status="skipped")
         cursor.close()
         connection.close()
         return
 
     print(f"📈 Inserting open price {open_price} for {market_day}...")
 
-    print("[LOG] Ensuring date exists in daily_data table")
-    cursor.execute(
-        """
-        INSERT INTO daily_data (date)
-        VALUES (%s)
-        ON CONFLICT (date) DO NOTHING
-        """,
-        (market_day,)
-    )
+    print("[LOG] Writing open price to daily_data")
+    with span("db_write"):
+        write_days(cursor, [{"date": market_day, "open_today": open_price}], table="daily_data")
+
+    print("[LOG] Evaluating pending forecasts")
+    with span("evaluate"):
+        counts = evaluate(cursor)
 
-    print("[LOG] Updating daily_data with open price")
-    cursor.execute(
-        """
-        UPDATE daily_data
-        SET open_today = %s
-        WHERE date = %s
-        """,
-        (open_price, market_day)
-    )
+    # Every day evaluate scored, not just market_day (e.g. a late forecast or a corrected open)
+    print("[LOG] Updating metrics")
+    with span("metrics"):
+        fold_scored_days(cursor, counts["scored"])
 
-    connection.commit()
+    with span("commit"):
+        connection.commit()
     cursor.close()
     connection.close()
     print("✅ Market open update completed.")
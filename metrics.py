@@ -0,0 +1,160 @@
+from datetime import date
+from db import connect
+from evaluate import evaluate
+
+# Rolling hit-rate windows (trading days); recent_hits keeps the longest one
+ROLLING_WINDOWS = (20, 60)
+RECENT_HITS_LENGTH = max(ROLLING_WINDOWS)
+
+OVERALL_BUCKET = "all"
+VOLATILITY_BUCKET_PREFIX = "volatility:"
+
+METRICS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS metrics_aggregates (
+    bucket TEXT PRIMARY KEY,
+    days INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    sum_abs_error NUMERIC NOT NULL DEFAULT 0,
+    recent_hits TEXT NOT NULL DEFAULT '',
+    last_date DATE
+)
+"""
+
+# Folding is idempotent: a bucket only accepts days newer than the last one it counted
+FOLD_DAY_SQL = """
+INSERT INTO metrics_aggregates (bucket, days, hits, sum_abs_error, recent_hits, last_date)
+VALUES (%(bucket)s, 1, %(hit)s, %(abs_error)s, %(hit_flag)s, %(date)s)
+ON CONFLICT (bucket) DO UPDATE SET
+  days = metrics_aggregates.days + 1,
+  hits = metrics_aggregates.hits + EXCLUDED.hits,
+  sum_abs_error = metrics_aggregates.sum_abs_error + EXCLUDED.sum_abs_error,
+  recent_hits = right(metrics_aggregates.recent_hits || EXCLUDED.recent_hits, %(window)s),
+  last_date = EXCLUDED.last_date
+WHERE metrics_aggregates.last_date IS NULL OR metrics_aggregates.last_date < EXCLUDED.last_date
+"""
+
+def buckets_for(volatility_indicator):
+    buckets = [OVERALL_BUCKET]
+    if volatility_indicator:
+        buckets.append(VOLATILITY_BUCKET_PREFIX + volatility_indicator.strip().lower())
+    return buckets
+
+def is_hit(forecasted_pct, real_move_pct):
+    # A forecast is correct when it calls the direction of the close-to-open move
+    return (forecasted_pct >= 0) == (real_move_pct >= 0)
+
+def fold_day(cursor, day: date, forecasted_pct, real_move_pct, volatility_indicator):
+    hit = is_hit(forecasted_pct, real_move_pct)
+    for bucket in buckets_for(volatility_indicator):
+        cursor.execute(FOLD_DAY_SQL, {
+            "bucket": bucket,
+            "hit": int(hit),
+            "abs_error": abs(float(forecasted_pct) - float(real_move_pct)),
+            "hit_flag": "1" if hit else "0",
+            "date": day,
+            "window": RECENT_HITS_LENGTH,
+        })
+    return hit
+
+# Fold the forecast for `day` into the aggregates once evaluate.py has scored it
+def close_day(cursor, day: date):
+    cursor.execute(METRICS_TABLE_DDL)
+    cursor.execute(
+        """
+        SELECT d.real_move_pct, p.forecasted_pct, p.volatility_indicator
+        FROM daily_data d
+        LEFT JOIN predictions p ON p.date = d.date
+        WHERE d.date = %s
+        """,
+        (day,)
+    )
+    row = cursor.fetchone()
+    if row is None or row[0] is None:
+        print(f"⚠️ Missing close/open price for {day}. Skipping metrics update.")
+        return None
+    real_move_pct, forecasted_pct, volatility_indicator = row
+    if forecasted_pct is None:
+        print(f"⚠️ No forecast stored for {day}. Skipping metrics update.")
+        return None
+
+    hit = fold_day(cursor, day, forecasted_pct, real_move_pct, volatility_indicator)
+    print(f"[LOG] Scored {day}: real move {float(real_move_pct):.2f}%, correct={hit}")
+    return hit
+
+# Fold the days evaluate() just scored, oldest first. A day at or before the last
+# one already counted can't be folded (or unfolded) incrementally, so the
+# aggregates are recomputed from history instead.
+def fold_scored_days(cursor, days):
+    if not days:
+        return
+    cursor.execute(METRICS_TABLE_DDL)
+    cursor.execute("SELECT last_date FROM metrics_aggregates WHERE bucket = %s", (OVERALL_BUCKET,))
+    row = cursor.fetchone()
+    last_date = row[0] if row else None
+    days = sorted(days)
+    if last_date is not None and days[0] <= last_date:
+        print(f"[LOG] {days[0]} was scored after {last_date} was counted, rebuilding metrics")
+        rebuild_metrics(cursor)
+        return
+    for day in days:
+        close_day(cursor, day)
+
+# Recompute every aggregate from history, e.g. after a backfill inserted older days
+def rebuild_metrics(cursor):
+    cursor.execute(METRICS_TABLE_DDL)
+    # Days that were never evaluated get their real move and correctness first
+    evaluate(cursor)
+    cursor.execute("DELETE FROM metrics_aggregates")
+    cursor.execute(
+        """
+        SELECT d.date, p.forecasted_pct, d.real_move_pct, p.volatility_indicator
+        FROM daily_data d
+        JOIN predictions p ON p.date = d.date
+        WHERE d.real_move_pct IS NOT NULL AND p.forecasted_pct IS NOT NULL
+        ORDER BY d.date
+        """
+    )
+    rows = cursor.fetchall()
+    for day, forecasted_pct, real_move_pct, volatility_indicator in rows:
+        fold_day(cursor, day, forecasted_pct, real_move_pct, volatility_indicator)
+    print(f"[LOG] Rebuilt metrics from {len(rows)} scored days")
+
+def ensure_metrics_table():
+    # First start after a deploy: create the aggregates with the history already
+    # folded in, on a connection of its own, so /metrics never reads a missing table
+    connection = connect()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('metrics_aggregates') IS NULL")
+            if cursor.fetchone()[0]:
+                print("[LOG] Creating metrics_aggregates from the scored history")
+                rebuild_metrics(cursor)
+        connection.commit()
+    finally:
+        connection.close()
+
+# — Read side —
+def summarize_bucket(row):
+    days = row["days"]
+    recent_hits = row["recent_hits"] or ""
+    summary = {
+        "days": days,
+        "hit_rate": row["hits"] / days if days else None,
+        "mean_abs_error": float(row["sum_abs_error"]) / days if days else None,
+        "last_date": row["last_date"].strftime("%Y-%m-%d") if row["last_date"] else None,
+    }
+    for window in ROLLING_WINDOWS:
+        recent = recent_hits[-window:]
+        summary[f"hit_rate_{window}d"] = recent.count("1") / len(recent) if recent else None
+    return summary
+
+if __name__ == "__main__":
+    from data_events import notify_data_changed
+
+    connection = connect()
+    cursor = connection.cursor()
+    rebuild_metrics(cursor)
+    notify_data_changed(cursor, "metrics_aggregates", date.today())
+    connection.commit()
+    cursor.close()
+    connection.close()
@@ -0,0 +1,82 @@
+import re
+import zlib
+import numpy as np
+
+# Local headline ranking: every fetched article (title + description) is turned
+# into a hashed TF-IDF vector in one pass, near-duplicate wire stories are
+# dropped by cosine similarity and the rest are ranked by how much they talk
+# about market-moving topics. Pure NumPy, no external service.
+
+HASH_DIM = 2 ** 12
+DUPLICATE_THRESHOLD = 0.6
+TOP_K = 10
+
+# Weight of each topic term in the relevance score
+MARKET_TERMS = {
+    "fed": 3.0, "federal": 1.5, "reserve": 1.5, "powell": 2.5, "fomc": 3.0,
+    "rate": 2.0, "rates": 2.0, "hike": 2.0, "cut": 1.5, "inflation": 3.0,
+    "cpi": 3.0, "ppi": 2.0, "jobs": 2.0, "payrolls": 3.0, "unemployment": 2.0,
+    "gdp": 2.5, "recession": 3.0, "yields": 2.5, "treasury": 2.0, "bond": 1.5,
+    "stocks": 2.0, "stock": 1.5, "market": 1.5, "markets": 1.5, "futures": 2.0,
+    "s&p": 2.5, "dow": 2.0, "nasdaq": 2.0, "earnings": 2.0, "guidance": 1.5,
+    "oil": 2.0, "opec": 2.0, "dollar": 1.5, "tariff": 2.5, "tariffs": 2.5,
+    "trade": 1.5, "china": 1.5, "ecb": 2.5, "boj": 2.0, "war": 2.0,
+    "sanctions": 1.5, "selloff": 2.5, "rally": 2.0, "crash": 2.5, "default": 2.0,
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9&]+")
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+def _bucket(token):
+    # crc32 is stable across processes, unlike hash()
+    return zlib.crc32(token.encode()) % HASH_DIM
+
+def article_text(article):
+    return " ".join(filter(None, [article.get("title"), article.get("description")]))
+
+def tfidf_matrix(token_lists):
+    # One bincount over (row, bucket) pairs builds the whole term-count matrix
+    rows = [i for i, tokens in enumerate(token_lists) for _ in tokens]
+    buckets = [_bucket(t) for tokens in token_lists for t in tokens]
+    flat = np.asarray(rows, dtype=np.int64) * HASH_DIM + np.asarray(buckets, dtype=np.int64)
+    counts = np.bincount(flat, minlength=len(token_lists) * HASH_DIM)
+    counts = counts.reshape(len(token_lists), HASH_DIM).astype(np.float32)
+
+    # Sublinear tf, smoothed idf over the fetched batch, L2-normalized rows
+    tf = np.log1p(counts)
+    df = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(token_lists)) / (1 + df)) + 1
+    matrix = tf * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+def relevance_scores(token_lists):
+    scores = np.zeros(len(token_lists))
+    for i, tokens in enumerate(token_lists):
+        if tokens:
+            scores[i] = sum(MARKET_TERMS.get(t, 0.0) for t in tokens) / np.sqrt(len(tokens))
+    return scores
+
+def rank_headlines(articles, top_k=TOP_K, threshold=DUPLICATE_THRESHOLD):
+    articles = [a for a in articles if a.get("title") and a["title"] != "[Removed]"]
+    if not articles:
+        return []
+
+    token_lists = [tokenize(article_text(a)) for a in articles]
+    vectors = tfidf_matrix(token_lists)
+    scores = relevance_scores(token_lists)
+
+    # Greedy pick in score order (ties keep NewsAPI's order), skipping anything
+    # too similar to a headline that was already picked
+    order = np.argsort(-scores, kind="stable")
+    similarity = vectors[order] @ vectors[order].T
+    picked = []
+    for position in range(len(order)):
+        if picked and similarity[position, picked].max() >= threshold:
+            continue
+        picked.append(position)
+        if len(picked) == top_k:
+            break
+    return [articles[order[p]]["title"] for p in picked]
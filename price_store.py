@@ -0,0 +1,155 @@
+import os
+from datetime import datetime, date, timedelta
+import numpy as np
+from fetch import aget_json, get_json
+
+# Local time-series store for VT bars.
+# Bars live in an append-only binary file of fixed-size records sorted by
+# timestamp, so "open on day D" / "close on day D" are two binary searches and
+# each refresh only downloads bars newer than the last one stored.
+
+STORE_DIR = os.getenv("PRICE_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "prices"))
+
+BAR_DTYPE = np.dtype([
+    ("ts", "<i8"),  # seconds since epoch of the exchange-local bar start
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+FMP_BASE_URL = os.getenv("FMP_BASE_URL", "https://financialmodelingprep.com/api/v3/")
+DAILY_HISTORY_DAYS = 5 * 365
+EPOCH = datetime(1970, 1, 1)
+
+def to_ts(value):
+    if isinstance(value, datetime):
+        return int((value - EPOCH).total_seconds())
+    return int((datetime.combine(value, datetime.min.time()) - EPOCH).total_seconds())
+
+def parse_bar_time(text):
+    # FMP uses "YYYY-MM-DD" for daily bars and "YYYY-MM-DD HH:MM:SS" for intraday bars
+    fmt = "%Y-%m-%d %H:%M:%S" if " " in text else "%Y-%m-%d"
+    return to_ts(datetime.strptime(text, fmt))
+
+def rows_to_bars(rows):
+    bars = np.empty(len(rows), dtype=BAR_DTYPE)
+    for i, row in enumerate(rows):
+        close = row.get("close")
+        bars[i] = (
+            parse_bar_time(row["date"]),
+            row.get("open", close),
+            row.get("high", close),
+            row.get("low", close),
+            close,
+            row.get("volume", 0) or 0,
+        )
+    bars.sort(order="ts")
+    return bars
+
+class BarStore:
+    def __init__(self, symbol, interval):
+        self.symbol = symbol
+        self.interval = interval
+        self.path = os.path.join(STORE_DIR, f"{symbol}_{interval}.bin")
+        if os.path.exists(self.path):
+            self.bars = np.fromfile(self.path, dtype=BAR_DTYPE)
+        else:
+            self.bars = np.empty(0, dtype=BAR_DTYPE)
+
+    def __len__(self):
+        return len(self.bars)
+
+    @property
+    def first_day(self):
+        return (EPOCH + timedelta(seconds=int(self.bars["ts"][0]))).date() if len(self.bars) else None
+
+    @property
+    def last_day(self):
+        return (EPOCH + timedelta(seconds=int(self.bars["ts"][-1]))).date() if len(self.bars) else None
+
+    def insert(self, bars):
+        if not len(bars):
+            return 0
+        if not len(self.bars) or bars["ts"][0] > self.bars["ts"][-1]:
+            # Common case: everything is newer, append the records to the file
+            os.makedirs(STORE_DIR, exist_ok=True)
+            with open(self.path, "ab") as f:
+                bars.tofile(f)
+            self.bars = np.concatenate([self.bars, bars])
+            return len(bars)
+
+        # Older or overlapping bars (e.g. a backfill reaching further back): merge and rewrite
+        merged = np.concatenate([self.bars, bars])
+        merged.sort(order="ts", kind="stable")
+        _, first_index = np.unique(merged["ts"], return_index=True)
+        merged = merged[first_index]
+        added = len(merged) - len(self.bars)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        merged.tofile(tmp_path)
+        os.replace(tmp_path, self.path)
+        self.bars = merged
+        return added
+
+    def append_newer(self, bars):
+        if len(self.bars):
+            bars = bars[bars["ts"] > self.bars["ts"][-1]]
+        return self.insert(bars)
+
+    def day_slice(self, day: date):
+        ts = self.bars["ts"]
+        lo = np.searchsorted(ts, to_ts(day), side="left")
+        hi = np.searchsorted(ts, to_ts(day + timedelta(days=1)), side="left")
+        return self.bars[lo:hi]
+
+    def open_on(self, day: date):
+        bars = self.day_slice(day)
+        return float(bars["open"][0]) if len(bars) else None
+
+    def close_on(self, day: date):
+        bars = self.day_slice(day)
+        return float(bars["close"][-1]) if len(bars) else None
+
+    def between(self, start: date, end: date):
+        ts = self.bars["ts"]
+        lo = np.searchsorted(ts, to_ts(start), side="left")
+        hi = np.searchsorted(ts, to_ts(end + timedelta(days=1)), side="left")
+        return self.bars[lo:hi]
+
+def daily_store(symbol="VT"):
+    return BarStore(symbol, "1day")
+
+def intraday_store(symbol="VT"):
+    return BarStore(symbol, "1min")
+
+# — Incremental refresh from FMP —
+def _fetch_window(store, start=None):
+    if start is None:
+        start = store.last_day or date.today() - timedelta(days=DAILY_HISTORY_DAYS)
+    return {"from": start.isoformat(), "to": date.today().isoformat()}
+
+def _completed_daily_bars(history):
+    # Today's daily bar is still forming; only store finished days
+    today = to_ts(date.today())
+    bars = rows_to_bars(history.get("historical", []) if isinstance(history, dict) else [])
+    return bars[bars["ts"] < today]
+
+async def aupdate_daily(fmp, store, start=None, throttle=None):
+    endpoint = f"historical-price-full/{store.symbol}"
+    history = await aget_json(fmp, endpoint, _fetch_window(store, start), throttle=throttle)
+    bars = _completed_daily_bars(history)
+    return store.insert(bars) if start else store.append_newer(bars)
+
+def update_daily(store, api_key, start=None):
+    url = f"{FMP_BASE_URL}historical-price-full/{store.symbol}"
+    history = get_json(url, {**_fetch_window(store, start), "apikey": api_key})
+    bars = _completed_daily_bars(history)
+    return store.insert(bars) if start else store.append_newer(bars)
+
+def update_intraday(store, api_key, day=None):
+    # An empty store only needs bars from `day` (default today) onwards
+    url = f"{FMP_BASE_URL}historical-chart/1min/{store.symbol}"
+    start = store.last_day or day or date.today()
+    data = get_json(url, {"from": start.isoformat(), "to": date.today().isoformat(), "apikey": api_key})
+    return store.append_newer(rows_to_bars(data if isinstance(data, list) else []))
@@ -0,0 +1,60 @@
+import asyncio
+from collections import OrderedDict
+
+# In-process cache of already-serialized API payloads.
+# Every entry belongs to a single data version; when the version moves on,
+# the whole cache is dropped and payloads are rebuilt lazily on next request.
+class PayloadCache:
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self.version = None
+        self.entries = OrderedDict()
+        # (version, key) -> task building that payload
+        self.building = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, version, key):
+        if version != self.version:
+            self.version = version
+            self.entries.clear()
+            return None
+        payload = self.entries.get(key)
+        if payload is not None:
+            self.entries.move_to_end(key)
+        return payload
+
+    async def get_or_build(self, version, key, build):
+        payload = self._lookup(version, key)
+        if payload is not None:
+            self.hits += 1
+            return payload
+
+        # Only one coroutine rebuilds a given payload, the others for that key await
+        # the same task; different keys build concurrently
+        task = self.building.get((version, key))
+        if task is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._build(version, key, build))
+            self.building[(version, key)] = task
+            task.add_done_callback(lambda done: self._finished(version, key, done))
+        # A waiter that is cancelled (client gone) must not cancel the build for the others
+        return await asyncio.shield(task)
+
+    async def _build(self, version, key, build):
+        payload = await build()
+        if version != self.version:
+            # Data changed while building: serve it, but don't keep it
+            return payload
+        self.entries[key] = payload
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return payload
+
+    def _finished(self, version, key, task):
+        self.building.pop((version, key), None)
+        # Mark a failure as seen even if every waiter went away before it finished
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,137 @@
+import threading
+
+# Denormalized read model behind /results: one row per forecasted day with
+# every Result field already typed (floats, ints, text) and the headline
+# summary, so the API reads a single primary-key range scan with no join.
+#
+# Writers keep it current inside their own statements: each upsert/update CTE
+# on daily_data, predictions or headlines is followed by upsert_results_cte(),
+# which rebuilds the touched days from the rows those CTEs return.
+# `python results_table.py` rebuilds the whole table from the base tables.
+
+RESULTS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS results (
+    date DATE PRIMARY KEY,
+    close_yesterday DOUBLE PRECISION,
+    open_today DOUBLE PRECISION,
+    real_move_pct DOUBLE PRECISION,
+    sentiment_score INTEGER,
+    market_impact_score INTEGER,
+    confidence_level INTEGER,
+    volatility_indicator TEXT,
+    forecasted_pct DOUBLE PRECISION,
+    calculated_pct DOUBLE PRECISION,
+    average_pct DOUBLE PRECISION,
+    correct BOOLEAN,
+    summary TEXT
+)
+"""
+
+# Same order as the Result model, so rows serialize straight to the API's JSON
+RESULT_COLUMNS = [
+    "date", "close_yesterday", "open_today", "real_move_pct", "sentiment_score", "market_impact_score",
+    "confidence_level", "volatility_indicator", "forecasted_pct", "calculated_pct", "average_pct",
+    "correct", "summary",
+]
+
+RESULTS_SELECT = """
+SELECT d.date, d.close_yesterday::float8, d.open_today::float8, d.real_move_pct::float8,
+       p.sentiment_score, p.market_impact_score, p.confidence_level, p.volatility_indicator,
+       p.forecasted_pct::float8, p.calculated_pct::float8, p.average_pct::float8, p.correct,
+       h.headline
+FROM {daily} d
+JOIN {predictions} p ON p.date = d.date
+LEFT JOIN {headlines} h ON h.date = d.date
+"""
+
+# Unchanged rows are left alone so rewrites of the same values don't bloat the table
+RESULTS_UPSERT = """
+INSERT INTO results ({columns})
+{select}
+ON CONFLICT (date) DO UPDATE SET {assignments}
+WHERE results IS DISTINCT FROM EXCLUDED
+"""
+
+REBUILD_RESULTS_SQL = """
+WITH rebuilt AS (
+    {upsert}
+    RETURNING date
+),
+removed AS (
+    DELETE FROM results r
+    WHERE NOT EXISTS (SELECT 1 FROM predictions p JOIN daily_data d ON d.date = p.date WHERE p.date = r.date)
+    RETURNING date
+)
+SELECT (SELECT count(*) FROM rebuilt), (SELECT count(*) FROM removed)
+"""
+
+def _upsert(select):
+    assignments = ", ".join(f"{column} = EXCLUDED.{column}" for column in RESULT_COLUMNS[1:])
+    return RESULTS_UPSERT.format(columns=", ".join(RESULT_COLUMNS), select=select, assignments=assignments)
+
+def _current(table, written, touched):
+    # CTEs in one statement can't see each other's writes: take the rows a sibling
+    # CTE returned, and the stored rows for the touched days it didn't write
+    stored = f"SELECT * FROM {table} WHERE date IN (SELECT date FROM {touched})"
+    if written is None:
+        return f"({stored})"
+    return f"(SELECT * FROM {written} UNION ALL {stored} AND date NOT IN (SELECT date FROM {written}))"
+
+def upsert_results_cte(touched, daily=None, predictions=None, headlines=None):
+    # `touched` names a CTE or relation with a `date` column; daily/predictions/headlines
+    # name the sibling CTEs that wrote those tables with RETURNING *, if any
+    select = RESULTS_SELECT.format(
+        daily=_current("daily_data", daily, touched),
+        predictions=_current("predictions", predictions, touched),
+        headlines=_current("headlines", headlines, touched),
+    )
+    return f"upsert_results AS ({_upsert(select)} RETURNING date\n)"
+
+_table_ready = False
+_table_lock = threading.Lock()
+
+def ensure_results_table():
+    # Created on first use and the existing history materialized right away, on a
+    # connection of its own: committed before any writer relies on it, so a writer
+    # rolling back can't take the table with it
+    global _table_ready
+    with _table_lock:
+        if _table_ready:
+            return
+        from db import connect  # db builds its statements from this module
+
+        connection = connect()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT to_regclass('results') IS NULL")
+                if cursor.fetchone()[0]:
+                    rebuild_results(cursor)
+            connection.commit()
+        finally:
+            connection.close()
+        _table_ready = True
+
+def rebuild_results_sql():
+    select = RESULTS_SELECT.format(daily="daily_data", predictions="predictions", headlines="headlines")
+    return REBUILD_RESULTS_SQL.format(upsert=_upsert(select))
+
+def rebuild_results(cursor):
+    cursor.execute(RESULTS_TABLE_DDL)
+    cursor.execute(rebuild_results_sql())
+    written, removed = cursor.fetchone()
+    print(f"[LOG] Rebuilt results: {written} rows written, {removed} removed")
+    return written, removed
+
+if __name__ == "__main__":
+    from datetime import date
+    from db import connect
+    from data_events import notify_data_changed
+
+    connection = connect()
+    cursor = connection.cursor()
+    written, removed = rebuild_results(cursor)
+    if written or removed:
+        notify_data_changed(cursor, "results", date.today(), days=written + removed)
+    connection.commit()
+    cursor.close()
+    connection.close()
@@ -0,0 +1,141 @@
+import os
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from db import connect
+from telemetry import count
+from trading_calendar import is_trading_day
+
+# In-process scheduler for the jobs, run inside the API service when
+# SCHEDULER_ENABLED is set. Jobs fire at exchange-local times on NYSE trading
+# days only, so the DST switch and holidays need no cron edits. They run one at
+# a time in a worker thread, reusing the process's DB pool, OpenAI client and
+# HTTP session, and take a Postgres advisory lock so a second replica (or a
+# manual `python scheduler.py --run ...`) never overlaps a running job.
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "").lower() in ("1", "true", "yes")
+EXCHANGE_TZ = ZoneInfo("America/New_York")
+
+# job -> exchange-local fire times
+SCHEDULE = {
+    "forecast_update": [time(4, 0), time(8, 30)],
+    "market_open_update": [time(10, 0)],  # first bars after the 9:30 open
+}
+
+# A run later than this (host asleep, a long previous job) is skipped, not replayed
+MISFIRE_GRACE = timedelta(minutes=30)
+# Re-check the clock at least this often, in case it jumps while we sleep
+MAX_SLEEP_SECONDS = 300
+
+# Shared by every process that runs the jobs
+JOB_LOCK_KEY = 4_242_001
+
+def load_job(name):
+    # Imported on first use: the job modules check their API keys at import time
+    if name == "forecast_update":
+        from daily_update import run_forecast_update
+        return run_forecast_update
+    if name == "market_open_update":
+        from market_open_update import run_market_open_update
+        return run_market_open_update
+    raise ValueError(f"Unknown job '{name}'")
+
+def next_run(after: datetime, schedule=SCHEDULE):
+    # Earliest (fire time in UTC, job) strictly after `after` (an aware datetime)
+    local = after.astimezone(EXCHANGE_TZ)
+    day = local.date()
+    while True:
+        if is_trading_day(day):
+            candidates = [
+                (datetime.combine(day, at, tzinfo=EXCHANGE_TZ).astimezone(timezone.utc), name)
+                for name, times in schedule.items() for at in times
+            ]
+            upcoming = [candidate for candidate in candidates if candidate[0] > after]
+            if upcoming:
+                return min(upcoming)
+        day += timedelta(days=1)
+
+def run_job(name):
+    # Runs one job under the advisory lock; returns False if another run holds it
+    connection = connect()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (JOB_LOCK_KEY,))
+            locked = cursor.fetchone()[0]
+        connection.commit()
+        if not locked:
+            print(f"⚠️ Another job run holds the lock, skipping {name}")
+            return False
+        try:
+            load_job(name)()
+        finally:
+            # Session-level lock: release it before the connection goes back to the pool
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (JOB_LOCK_KEY,))
+            connection.commit()
+        return True
+    finally:
+        connection.close()
+
+class JobScheduler:
+    def __init__(self, schedule=SCHEDULE):
+        self.schedule = schedule
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        # A job already running in its thread finishes on its own; its lock dies with the connection
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def _loop(self):
+        # Import the job modules (openai, pandas, numpy) once, up front
+        try:
+            for name in self.schedule:
+                await asyncio.to_thread(load_job, name)
+        except Exception as e:
+            print(f"❌ Scheduler not started, a job failed to load: {e}")
+            return
+
+        # Walk the schedule from the last fire time, not the clock, so a run
+        # that ends after the next fire time delays that job instead of dropping it
+        last = datetime.now(timezone.utc)
+        while True:
+            when, name = next_run(last, self.schedule)
+            last = when
+            print(f"[LOG] Next job: {name} at {when.astimezone(EXCHANGE_TZ):%Y-%m-%d %H:%M %Z}")
+            while (remaining := (when - datetime.now(timezone.utc)).total_seconds()) > 0:
+                await asyncio.sleep(min(remaining, MAX_SLEEP_SECONDS))
+
+            if datetime.now(timezone.utc) - when > MISFIRE_GRACE:
+                print(f"⚠️ Skipping {name} scheduled at {when:%H:%M} UTC, too late to be useful")
+                count("ai4vt_scheduler_runs_total", job=name, outcome="missed")
+                continue
+            try:
+                ran = await asyncio.to_thread(run_job, name)
+                count("ai4vt_scheduler_runs_total", job=name, outcome="ran" if ran else "locked")
+            except Exception as e:
+                print(f"❌ Scheduled {name} failed: {e}")
+                count("ai4vt_scheduler_runs_total", job=name, outcome="failed")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a job once under the scheduler's lock, or show upcoming runs.")
+    parser.add_argument("--run", choices=list(SCHEDULE), help="Job to run now")
+    parser.add_argument("--next", type=int, default=5, help="Upcoming runs to list when no job is given")
+    args = parser.parse_args()
+
+    if args.run:
+        run_job(args.run)
+    else:
+        when = datetime.now(timezone.utc)
+        for _ in range(args.next):
+            when, name = next_run(when)
+            print(f"{when.astimezone(EXCHANGE_TZ):%a %Y-%m-%d %H:%M %Z}  {name}")
@@ -0,0 +1,171 @@
+import numpy as np
+from news_ranking import MARKET_TERMS, article_text, tokenize
+from results_table import ensure_results_table, upsert_results_cte
+
+# Local sentiment / market-impact scoring for predictions.sentiment_score and
+# predictions.market_impact_score. A small finance lexicon is applied to every
+# article of a run (or every stored day of the history) at once: tokens are
+# mapped to lexicon ids and per-document sums come out of weighted bincounts.
+# Both scores are integers on a 0-100 scale; 50 is neutral sentiment.
+
+POSITIVE = {
+    "gain": 1.0, "gains": 1.0, "rise": 1.0, "rises": 1.0, "rising": 1.0, "rally": 1.5, "rallies": 1.5,
+    "surge": 1.5, "surges": 1.5, "soar": 1.5, "soars": 1.5, "jump": 1.0, "jumps": 1.0, "climb": 1.0,
+    "climbs": 1.0, "record": 1.0, "high": 0.5, "higher": 1.0, "up": 0.5, "beat": 1.0, "beats": 1.0,
+    "strong": 1.0, "stronger": 1.0, "growth": 1.0, "grow": 1.0, "expands": 1.0, "rebound": 1.5,
+    "recovery": 1.0, "recovers": 1.0, "optimism": 1.5, "optimistic": 1.5, "upbeat": 1.5, "boost": 1.0,
+    "boosts": 1.0, "easing": 1.0, "eases": 1.0, "cools": 1.0, "cooling": 1.0, "cut": 0.5, "cuts": 0.5,
+    "upgrade": 1.0, "upgrades": 1.0, "profit": 1.0, "profits": 1.0, "bullish": 1.5, "deal": 0.5,
+    "agreement": 0.5, "stimulus": 1.0, "resilient": 1.0, "robust": 1.0, "improve": 1.0, "improves": 1.0,
+}
+
+NEGATIVE = {
+    "fall": 1.0, "falls": 1.0, "falling": 1.0, "drop": 1.0, "drops": 1.0, "decline": 1.0, "declines": 1.0,
+    "slump": 1.5, "slumps": 1.5, "plunge": 1.5, "plunges": 1.5, "tumble": 1.5, "tumbles": 1.5,
+    "sink": 1.0, "sinks": 1.0, "slide": 1.0, "slides": 1.0, "loss": 1.0, "losses": 1.0, "lower": 1.0,
+    "down": 0.5, "miss": 1.0, "misses": 1.0, "weak": 1.0, "weaker": 1.0, "slowdown": 1.5, "slows": 1.0,
+    "recession": 2.0, "crisis": 2.0, "crash": 2.0, "selloff": 1.5, "fear": 1.5, "fears": 1.5,
+    "worries": 1.0, "worry": 1.0, "concern": 1.0, "concerns": 1.0, "risk": 0.5, "risks": 0.5,
+    "uncertainty": 1.0, "volatile": 1.0, "volatility": 0.5, "hike": 1.0, "hikes": 1.0, "tariff": 1.0,
+    "tariffs": 1.0, "war": 1.5, "sanctions": 1.0, "default": 1.5, "downgrade": 1.0, "downgrades": 1.0,
+    "layoffs": 1.0, "bearish": 1.5, "inflation": 0.5, "hot": 0.5, "turmoil": 1.5, "bankruptcy": 2.0,
+}
+
+NEGATIONS = {"not", "no", "never", "without", "despite", "fails", "failed"}
+
+# A document's intensity at which the impact score reaches ~63/100
+IMPACT_SCALE = 2.0
+
+# Every lexicon word gets an id; polarity and topic weight are looked up by id
+VOCABULARY = sorted(set(POSITIVE) | set(NEGATIVE) | set(MARKET_TERMS))
+WORD_IDS = {word: i for i, word in enumerate(VOCABULARY)}
+POLARITY = np.array([POSITIVE.get(w, 0.0) - NEGATIVE.get(w, 0.0) for w in VOCABULARY])
+TOPIC_WEIGHT = np.array([MARKET_TERMS.get(w, 0.0) for w in VOCABULARY])
+
+def lexicon_hits(texts):
+    # Flattened (document, word id, sign) triples for every lexicon token in every text
+    docs, ids, signs, lengths = [], [], [], []
+    for doc, text in enumerate(texts):
+        tokens = tokenize(text or "")
+        lengths.append(len(tokens))
+        for position, token in enumerate(tokens):
+            word_id = WORD_IDS.get(token)
+            if word_id is None:
+                continue
+            negated = position > 0 and tokens[position - 1] in NEGATIONS
+            docs.append(doc)
+            ids.append(word_id)
+            signs.append(-1.0 if negated else 1.0)
+    return (np.asarray(docs, dtype=np.int64), np.asarray(ids, dtype=np.int64),
+            np.asarray(signs), np.asarray(lengths, dtype=float))
+
+def score_texts(texts):
+    # Per-document polarity in [-1, 1] and non-negative market intensity
+    n = len(texts)
+    docs, ids, signs, lengths = lexicon_hits(texts)
+    polarity = POLARITY[ids] * signs
+    positive = np.bincount(docs, weights=np.clip(polarity, 0, None), minlength=n)
+    negative = np.bincount(docs, weights=np.clip(-polarity, 0, None), minlength=n)
+    topic = np.bincount(docs, weights=TOPIC_WEIGHT[ids], minlength=n)
+
+    doc_polarity = (positive - negative) / (positive + negative + 1.0)
+    intensity = (topic + positive + negative) / np.sqrt(np.maximum(lengths, 1.0))
+    return doc_polarity, intensity
+
+def aggregate(owners, groups, doc_polarity, intensity):
+    # Per-group 0-100 integers (None for empty groups); market-heavy articles weigh more
+    weights = intensity + 0.1
+    counts = np.bincount(owners, minlength=groups)
+    weight_sum = np.bincount(owners, weights=weights, minlength=groups)
+    polarity_sum = np.bincount(owners, weights=weights * doc_polarity, minlength=groups)
+    intensity_sum = np.bincount(owners, weights=intensity, minlength=groups)
+
+    present = counts > 0
+    sentiment = 50 + 50 * polarity_sum / np.where(present, weight_sum, 1)
+    impact = 100 * (1 - np.exp(-intensity_sum / np.maximum(counts, 1) / IMPACT_SCALE))
+    return [
+        {"sentiment_score": int(round(s)), "market_impact_score": int(round(i))} if ok
+        else {"sentiment_score": None, "market_impact_score": None}
+        for s, i, ok in zip(sentiment, impact, present)
+    ]
+
+def score_articles(articles):
+    texts = [article_text(a) for a in articles if a.get("title") and a["title"] != "[Removed]"]
+    return aggregate(np.zeros(len(texts), dtype=np.int64), 1, *score_texts(texts))[0]
+
+def score_days(texts_by_day):
+    # Bulk scoring: one pass over all texts of all days, then per-day aggregation
+    days = list(texts_by_day)
+    texts = [text for day in days for text in texts_by_day[day]]
+    owners = np.repeat(np.arange(len(days)), [len(texts_by_day[day]) for day in days])
+    return dict(zip(days, aggregate(owners, len(days), *score_texts(texts))))
+
+# — History —
+# Past days only kept the stored headline summary, so that is what gets scored.
+# The daily job and the backfill score the ~100 fetched articles instead; one
+# summary gives scores on a different scale, so those days are only rescored
+# from their summary when forced.
+SCORE_HISTORY_SQL = """
+SELECT p.date, h.headline
+FROM predictions p
+JOIN headlines h ON h.date = p.date
+WHERE h.headline IS NOT NULL {only_missing}
+ORDER BY p.date
+"""
+
+UPDATE_SCORES_SQL = """
+WITH updated AS (
+    UPDATE predictions AS p
+    SET sentiment_score = s.sentiment_score, market_impact_score = s.market_impact_score
+    FROM unnest(%s::date[], %s::integer[], %s::integer[]) AS s(date, sentiment_score, market_impact_score)
+    WHERE p.date = s.date
+      AND (p.sentiment_score IS DISTINCT FROM s.sentiment_score
+           OR p.market_impact_score IS DISTINCT FROM s.market_impact_score)
+    RETURNING p.*
+),
+{upsert_results}
+SELECT count(*) FROM updated
+""".format(upsert_results=upsert_results_cte("updated", predictions="updated"))
+
+def score_history(cursor, force=False):
+    only_missing = "" if force else "AND (p.sentiment_score IS NULL OR p.market_impact_score IS NULL)"
+    cursor.execute(SCORE_HISTORY_SQL.format(only_missing=only_missing))
+    rows = cursor.fetchall()
+    if not rows:
+        return 0
+
+    scores = score_days({day: [headline] for day, headline in rows})
+    days = list(scores)
+    ensure_results_table()
+    cursor.execute(UPDATE_SCORES_SQL, (
+        days,
+        [scores[d]["sentiment_score"] for d in days],
+        [scores[d]["market_impact_score"] for d in days],
+    ))
+    return cursor.fetchone()[0]
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import date
+    from db import connect
+    from data_events import notify_data_changed
+
+    parser = argparse.ArgumentParser(description="Score sentiment and market impact for stored days.")
+    parser.add_argument(
+        "--force", action="store_true",
+        help="Also rescore days that already have scores, replacing the article-based scores written by the "
+             "daily job and the backfill with scores from the single stored summary (not comparable)",
+    )
+    args = parser.parse_args()
+    if args.force:
+        print("⚠️ --force replaces every stored score, including article-based ones, with summary-based scores")
+
+    connection = connect()
+    cursor = connection.cursor()
+    updated = score_history(cursor, force=args.force)
+    if updated:
+        notify_data_changed(cursor, "predictions", date.today(), days=updated)
+    connection.commit()
+    print(f"[LOG] Scored {updated} days")
+    cursor.close()
+    connection.close()
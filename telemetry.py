@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+# In-process timing and counters shared by the jobs and the API.
+#   span(name)          times a block into a histogram (and into the current run record, if any)
+#   count(name, n)      adds to a counter, e.g. bytes fetched or tokens used
+#   run_record(job)     collects a job's spans and counters and appends them as one JSON line
+#   render_prometheus() text exposition of every metric, served by the API at /telemetry
+# Everything lives in process memory; nothing is sent anywhere.
+
+RUNS_FILE = os.getenv(
+    "TELEMETRY_RUNS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "telemetry", "runs.jsonl")
+)
+
+STAGE_METRIC = "ai4vt_stage_duration_seconds"
+QUERY_METRIC = "ai4vt_db_query_duration_seconds"
+SERIALIZE_METRIC = "ai4vt_serialization_duration_seconds"
+REQUEST_METRIC = "ai4vt_http_request_duration_seconds"
+
+# Upper bounds in seconds, from sub-millisecond queries to minute-long jobs
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+METRIC_HELP = {
+    STAGE_METRIC: "Duration of a job stage",
+    QUERY_METRIC: "Duration of an API database query",
+    SERIALIZE_METRIC: "Duration of serializing an API payload",
+    REQUEST_METRIC: "Duration of an API request until its headers are sent",
+    "ai4vt_stage_errors_total": "Stages that raised",
+    "ai4vt_fetch_requests_total": "Provider fetches by source (network, cache or stale)",
+    "ai4vt_fetch_bytes_total": "Response bytes downloaded from providers",
+    "ai4vt_openai_tokens_total": "OpenAI tokens used",
+    "ai4vt_scheduler_runs_total": "Scheduled job runs by outcome (ran, locked, missed or failed)",
+}
+
+class Histogram:
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+
+    def inc(self, name, value, labels):
+        with self.lock:
+            self.counters[(name, labels)] += value
+
+    def observe(self, name, value, labels):
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = Histogram()
+            histogram.observe(value)
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+registry = Registry()
+
+# The run record and enclosing span follow the code through asyncio tasks and
+# asyncio.to_thread, which both copy the context
+_current_run = contextvars.ContextVar("telemetry_run", default=None)
+_current_span = contextvars.ContextVar("telemetry_span", default=None)
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+# Metric names are positional-only so that `name` stays free as a label
+def count(metric, value=1, /, **labels):
+    labels = _labels(labels)
+    registry.inc(metric, value, labels)
+    run = _current_run.get()
+    if run is not None:
+        series = _series(metric, labels)
+        with registry.lock:
+            run["counters"][series] = run["counters"].get(series, 0) + value
+
+def observe(metric, value, /, **labels):
+    registry.observe(metric, value, _labels(labels))
+
+@contextmanager
+def span(name, metric=STAGE_METRIC, **labels):
+    # Yields a dict; whatever the block puts in it is kept as the span's attributes in the run record
+    attributes = {}
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        _current_span.reset(token)
+        registry.observe(metric, duration, _labels({"name": name, **labels}))
+        if error:
+            count("ai4vt_stage_errors_total", name=name)
+        run = _current_run.get()
+        if run is not None:
+            record = {"name": name, "start_s": round(started - run["_started"], 4), "duration_s": round(duration, 4)}
+            if parent:
+                record["parent"] = parent
+            if error:
+                record["error"] = error
+            if attributes:
+                record["attributes"] = attributes
+            run["spans"].append(record)
+
+def annotate_run(**fields):
+    # e.g. status="skipped" when the market is closed, or status="error" for a handled failure
+    run = _current_run.get()
+    if run is not None:
+        run.update(fields)
+
+@contextmanager
+def run_record(job, path=None):
+    # Usable as a decorator; the record is written even if the job raises
+    run = {
+        "job": job,
+        "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "status": "ok",
+        "spans": [],
+        "counters": {},
+        "_started": time.perf_counter(),
+    }
+    token = _current_run.set(run)
+    try:
+        yield run
+    except BaseException as e:
+        run.update(status="error", error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current_run.reset(token)
+        run["duration_s"] = round(time.perf_counter() - run.pop("_started"), 4)
+        write_run_record(run, path or RUNS_FILE)
+
+def write_run_record(run, path):
+    line = json.dumps(run, default=str, separators=(",", ":"))
+    # "-" prints the record instead, for CI logs where files don't outlive the job
+    if path == "-":
+        print(f"[TELEMETRY] {line}")
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(line + "\n")
+        print(f"[LOG] Run record appended to {path}")
+    except OSError as e:
+        print(f"⚠️ Could not write run record: {e}")
+
+# — Prometheus text exposition —
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+def render_prometheus():
+    with registry.lock:
+        counters = sorted(registry.counters.items())
+        histograms = sorted(
+            (key, list(h.counts), h.sum, h.count, h.buckets) for key, h in registry.histograms.items()
+        )
+
+    lines = []
+    typed = set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in counters:
+        header(name, "counter")
+        lines.append(f"{_series(name, labels)} {_format_value(value)}")
+
+    for (name, labels), counts, total, n, buckets in histograms:
+        header(name, "histogram")
+        cumulative = 0
+        for bound, bucket_count in zip((*buckets, "+Inf"), counts):
+            cumulative += bucket_count
+            le = bound if bound == "+Inf" else repr(float(bound))
+            lines.append(f"{_series(name + '_bucket', labels + (('le', le),))} {cumulative}")
+        lines.append(f"{_series(name + '_sum', labels)} {repr(total)}")
+        lines.append(f"{_series(name + '_count', labels)} {n}")
+
+    return "\n".join(lines) + "\n"
+
+class RequestTimingMiddleware:
+    # ASGI middleware timing each request until its response headers go out, so
+    # streamed bodies (NDJSON, server-sent events) don't count their whole lifetime
+    def __init__(self, app, metric=REQUEST_METRIC):
+        self.app = app
+        self.metric = metric
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                # The router records the matched route on the scope; label by its template, not the raw path
+                route = getattr(scope.get("route"), "path", "unmatched")
+                observe(self.metric, time.perf_counter() - started,
+                        route=route, method=scope["method"], status=message["status"])
+            await send(message)
+
+        await self.app(scope, receive, timed_send)
@@ -0,0 +1,137 @@
+from datetime import date, time, timedelta
+
+# Offline NYSE trading calendar: holidays and early closes are derived from the
+# exchange rules once per year and kept in lookup tables, so every calendar
+# question is answered locally without a network call.
+
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# Unscheduled closures that no rule can derive
+SPECIAL_CLOSURES = {
+    date(2001, 9, 11): "September 11 attacks",
+    date(2001, 9, 12): "September 11 attacks",
+    date(2001, 9, 13): "September 11 attacks",
+    date(2001, 9, 14): "September 11 attacks",
+    date(2004, 6, 11): "National Day of Mourning for Ronald Reagan",
+    date(2007, 1, 2): "National Day of Mourning for Gerald Ford",
+    date(2012, 10, 29): "Hurricane Sandy",
+    date(2012, 10, 30): "Hurricane Sandy",
+    date(2018, 12, 5): "National Day of Mourning for George H. W. Bush",
+    date(2025, 1, 9): "National Day of Mourning for Jimmy Carter",
+}
+
+_holidays = {}
+_half_days = set()
+_loaded_years = set()
+
+def _easter(year):
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+def _nth_weekday(year, month, weekday, n):
+    first = date(year, month, 1)
+    return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+
+def _last_weekday(year, month, weekday):
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def _observed(day):
+    # Saturday holidays move to Friday, Sunday holidays to Monday
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+def _year_holidays(year):
+    holidays = {}
+
+    # New Year's Day is not moved back to Friday when it falls on a Saturday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays[_observed(new_year)] = "New Year's Day"
+    if year >= 1998:
+        holidays[_nth_weekday(year, 1, 0, 3)] = "Martin Luther King Jr. Day"
+    holidays[_nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    holidays[_easter(year) - timedelta(days=2)] = "Good Friday"
+    holidays[_last_weekday(year, 5, 0)] = "Memorial Day"
+    if year >= 2022:
+        holidays[_observed(date(year, 6, 19))] = "Juneteenth"
+    holidays[_observed(date(year, 7, 4))] = "Independence Day"
+    holidays[_nth_weekday(year, 9, 0, 1)] = "Labor Day"
+    holidays[_nth_weekday(year, 11, 3, 4)] = "Thanksgiving Day"
+    holidays[_observed(date(year, 12, 25))] = "Christmas Day"
+
+    for day, name in SPECIAL_CLOSURES.items():
+        if day.year == year:
+            holidays[day] = name
+    return holidays
+
+def _year_half_days(year, holidays):
+    candidates = [
+        date(year, 7, 3),
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1),  # Day after Thanksgiving
+        date(year, 12, 24),
+    ]
+    return {day for day in candidates if day.weekday() < 5 and day not in holidays}
+
+def _load_year(year):
+    if year in _loaded_years:
+        return
+    holidays = _year_holidays(year)
+    _holidays.update(holidays)
+    _half_days.update(_year_half_days(year, holidays))
+    _loaded_years.add(year)
+
+# Precompute the years the pipeline works with; others are loaded on first use
+for _year in range(2000, date.today().year + 2):
+    _load_year(_year)
+
+def holiday_name(day: date):
+    _load_year(day.year)
+    return _holidays.get(day)
+
+def is_trading_day(day: date):
+    _load_year(day.year)
+    return day.weekday() < 5 and day not in _holidays
+
+def is_half_day(day: date):
+    _load_year(day.year)
+    return day in _half_days
+
+def market_close_time(day: date):
+    if not is_trading_day(day):
+        return None
+    return EARLY_CLOSE if is_half_day(day) else REGULAR_CLOSE
+
+def previous_trading_day(day: date):
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+def next_trading_day(day: date):
+    day += timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    return day
+
+def trading_days_between(start: date, end: date):
+    day = start
+    while day <= end:
+        if is_trading_day(day):
+            yield day
+        day += timedelta(days=1)